@@ -1,6 +1,19 @@
+import contextlib
 import ipaddress
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import meraki
 
+from automation import bulk_client
+from automation import concurrency
+from automation import hedging
+from automation import listings
+from automation import models
+from automation import topology_cache
+
 
 def check_ip_validity(ip: str) -> bool:
     """
@@ -29,12 +42,40 @@ def check_ip_validity(ip: str) -> bool:
     return False
 
 
+# Networks asked per page: few round trips, while only one page of raw dicts is decoded at a time
+NETWORKS_PAGE_SIZE = 5000
+
+# Seconds during which a cached listing is used as is, without fetching it again in the background
+LISTING_FRESHNESS = 300
+
+# Number of times a bulk operation is tried on a device when it is rate limited or fails on the Dashboard side
+BULK_MAXIMUM_ATTEMPTS = 4
+
+
+def retry_delay(error: meraki.APIError) -> float:
+    """
+    Returns how long to wait before retrying a failed Dashboard request, following the Retry-After header if any.
+
+    :param error: error raised by the meraki library
+    :return: delay in seconds
+    """
+    response = error.response
+    if response is not None and 'Retry-After' in response.headers:
+        try:
+            return float(response.headers['Retry-After'])
+        except ValueError:
+            pass
+    return 1.0
+
+
 class AutomationCore:
     """
     **This class was made to automate Meraki devices configuration**
     It uses the "meraki" python library V1
 
     It contains multiple functions permitting to easily change a network device's DNS IP.
+    Device functions don't keep any state on the instance, so they can be called from several threads at the same time.
+    Bulk functions run the devices on a thread pool, through a bulk client sharing the Dashboard HTTP session.
 
     ...
 
@@ -43,6 +84,10 @@ class AutomationCore:
     _dashboard : DashboardAPI
         the dashboardAPI that enables the program to request the Meraki Dashboard.
 
+    _bulk_client : BulkClient (private)
+        The client used by bulk methods. It sends each request once, so that rate limiting is waited out by the bulk
+        run, outside of its concurrency slots.
+
     _org_id : str (private)
         The Meraki organization ID where the targeted devices are.
         It needs to be set by using the "set_working_organization" method before using specific org-related functions
@@ -50,26 +95,44 @@ class AutomationCore:
     _network_id : str (private)
         The Meraki network ID that will be used by the class methods.
         It needs to be set by using the "set_working_network" method before using specific network-related functions
+        Network-related functions also accept an explicit network_id, which is safer when sharing the instance
+        between threads.
+
+    _concurrency_settings : dict (private)
+        The initial, minimum and maximum in-flight requests used by the adaptive concurrency controller of bulk methods.
+        It can be changed by using the "set_bulk_concurrency" method.
 
-    _wan1 : dict (private)
-        The Wan1 object is a dict() python variable.
-        It contains the network information that will be used to configure the device management interface.
+    _read_settings : dict (private)
+        The deadline and hedging settings of the bulk methods Dashboard reads.
+        It can be changed by using the "set_bulk_read_policy" method.
+
+    _topology_cache : TopologyCache (private)
+        The on-disk cache of the organizations and networks listings of the current API key.
+        Cached listings are returned right away, and revalidated in the background once they are older than
+        LISTING_FRESHNESS seconds. It is None if the cache is disabled.
+
+    _listings_listener : function (private)
+        Called with the kind and scope of a cached listing that changed after a background revalidation,
+        so that a page showing it can be refreshed. It can be set by using the "set_listings_listener" method.
 
 
     """
 
     def __init__(self):
         self._dashboard = None
+        self._bulk_client = None
         self._org_id = ''
         self._network_id = ''
-        self._wan1 = dict(usingStaticIp=True,
-                          staticIp='',
-                          staticSubnetMask='',
-                          staticGatewayIp='',
-                          staticDns=['', ''],
-                          vlan=None)
+        self._concurrency_settings = dict(initial=4, minimum=1, maximum=16)
+        self._read_settings = dict(deadline=None, hedge_percentile=None, hedge_budget=0.1)
+        self._topology_cache = None
+        self._listings_listener = None
+
+        # Listings being revalidated in the background, so the same listing isn't fetched twice at the same time
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
 
-    def set_working_api_key(self, api_key: str):
+    def set_working_api_key(self, api_key: str, use_cache: bool = True):
         """
         This method first checks your Meraki Dashboard API key and if it is correct, it will set it and return True.
         If the key is incorrect, it will return False.
@@ -77,6 +140,7 @@ class AutomationCore:
         Since meraki.myorgaccess doesn't exist anymore, it tries a function to test out the key.
 
         :param api_key:
+        :param use_cache: keeps the Dashboard listings on disk to speed up the next launches
         :return:
         """
 
@@ -84,7 +148,20 @@ class AutomationCore:
 
             # Tries to create a persistent Meraki Dashboard API session with the given api_key
             self._dashboard = meraki.DashboardAPI(api_key=api_key)
-            self._dashboard.organizations.getOrganizations()
+            listings.enable_compression(self._dashboard)
+
+            # Bulk runs retry on their own, the library keeps its retries for the other calls
+            self._bulk_client = bulk_client.BulkClient(self._dashboard)
+            user_organizations = self._dashboard.organizations.getOrganizations()
+
+            # Opens the listings cache of this API key, instead of the previous key one,
+            # and saves the organizations that were just fetched
+            if self._topology_cache is not None:
+                self._topology_cache.close()
+            self._topology_cache = self._open_topology_cache(api_key) if use_cache else None
+            if self._topology_cache is not None:
+                self._topology_cache.update('organizations', '',
+                                            [models.Organization.from_json(row) for row in user_organizations])
 
             # Return true the key is valid
             return True
@@ -98,6 +175,48 @@ class AutomationCore:
             # Returns false if the key is invalid
             return False
 
+    def set_listings_listener(self, listener):
+        """
+        Sets the function called when a cached listing changed after its background revalidation.
+        It is called from the revalidation thread, with the listing kind ('organizations' or 'networks')
+        and scope (organization ID for networks, empty for organizations).
+
+        :param listener: function taking the kind and the scope of the changed listing, None to remove it
+        :return:
+        """
+        self._listings_listener = listener
+
+    def set_bulk_concurrency(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        """
+        Sets the in-flight requests bounds used by the bulk DNS methods.
+        Each bulk run starts at 'initial' requests and adapts itself between 'minimum' and 'maximum'.
+
+        :param initial: number of in-flight requests at the start of a bulk run
+        :param minimum: lowest number of in-flight requests
+        :param maximum: highest number of in-flight requests
+        :return:
+        """
+
+        # Creating a controller checks the values before saving them
+        concurrency.AdaptiveConcurrencyController(initial=initial, minimum=minimum, maximum=maximum)
+        self._concurrency_settings = dict(initial=initial, minimum=minimum, maximum=maximum)
+
+    def set_bulk_read_policy(self, deadline: float = None, hedge_percentile: float = None, hedge_budget: float = 0.1):
+        """
+        Sets the deadline and hedging used by default for the Dashboard reads of bulk DNS methods.
+        Each bulk method also accepts its own read policy, to configure a single job.
+
+        :param deadline: maximum duration of a read in seconds, None for no deadline
+        :param hedge_percentile: latency percentile after which a duplicate read is sent, None to disable hedging
+        :param hedge_budget: maximum number of duplicate reads, as a fraction of the reads
+        :return:
+        """
+
+        # Creating a policy checks the values before saving them
+        hedging.ReadPolicy(deadline=deadline, hedge_percentile=hedge_percentile, hedge_budget=hedge_budget,
+                           max_workers=1).shutdown()
+        self._read_settings = dict(deadline=deadline, hedge_percentile=hedge_percentile, hedge_budget=hedge_budget)
+
     def set_working_organization(self, organization_name: str):
         """
             Sets the organization ID that will be used by the program by using the network name.
@@ -108,19 +227,25 @@ class AutomationCore:
         """
         try:
             # Gets all the organizations information related to the current api_key in a list
-            user_organizations = self._dashboard.organizations.getOrganizations()
+            user_organizations = self._list_organizations()
+
+            # The matching ID is searched locally and set once, so other threads never see a half-done search
+            org_id = ''
 
             # Iterates on each element of the list
-            for row in user_organizations:
+            for organization in user_organizations:
 
                 # Checks if the current organization name match the given one
-                if organization_name in row['name']:
-                    # If yes, sets its self.org_id with it
-                    self._org_id = row['id']
+                if organization_name in organization.name:
+                    # If yes, keeps its ID
+                    org_id = organization.id
 
             # If at the end, no organization with the given name was found, it raises an Value Error
-            if self._org_id == '':
+            if org_id == '':
                 raise ValueError
+
+            # Sets the working organization
+            self._org_id = org_id
         except ValueError:
             print('Cannot find that organization, please retry with a existing organization name')
 
@@ -134,20 +259,26 @@ class AutomationCore:
         """
 
         # Gets all the networks information related to the previously set org_id in a list.
-        organization_networks = self._dashboard.organizations.getOrganizationNetworks(self._org_id)
+        organization_networks = self._list_networks()
+
+        # The matching ID is searched locally and set once, so other threads never see a half-done search
+        network_id = ''
 
         try:
             # Iterates on each element of the list
-            for row in organization_networks:
+            for network in organization_networks:
 
                 # Checks if the current network name match the given one
-                if network_name in row['name']:
-                    # If yes, sets its self.org_id with it
-                    self._network_id = row['id']
+                if network_name in network.name:
+                    # If yes, keeps its ID
+                    network_id = network.id
 
             # If at the end, no network with the given name was found, it raises an Value Error
-            if self._network_id == '':
+            if network_id == '':
                 raise ValueError
+
+            # Sets the working network
+            self._network_id = network_id
         except ValueError:
             print('Cannot find that network, please retry with an existing network name')
 
@@ -159,196 +290,546 @@ class AutomationCore:
         """
 
         # Gets all the organizations information related to the current api_key in a list
-        user_organizations = self._dashboard.organizations.getOrganizations()
+        user_organizations = self._list_organizations()
 
         # Initialises the return list containing all available organizations
         organizations_names = []
 
         # Iterates on each element of the list
-        for row in user_organizations:
-            # For each element of the list, it adds the value 'name' inside of the return list
-            organizations_names.append(row['name'])
+        for organization in user_organizations:
+            # For each element of the list, it adds its name inside of the return list
+            organizations_names.append(organization.name)
 
         # Returns the list containing all organizations names.
         return organizations_names
 
-    def get_available_networks_names_list(self):
+    def get_available_networks_names_list(self, organization_id: str = None):
         """
         Returns the user accessible networks names.
 
+        :param organization_id: organization to look into, the currently-working organization is used if None
         :return: networks_names
         """
-        # Gets all the networks information related to the current api_key in a list
-        user_networks = self._dashboard.organizations.getOrganizationNetworks(self._org_id)
+        # Gets all the networks information related to the organization in a list
+        user_networks = self._list_networks(organization_id=organization_id)
 
         # Initialises the return list containing all available networks
         networks_names = []
 
         # Iterates on each element of the list
-        for row in user_networks:
-            # For each element of the list, it adds the value 'name' inside of the return list
-            networks_names.append(row['name'])
+        for network in user_networks:
+            # For each element of the list, it adds its name inside of the return list
+            networks_names.append(network.name)
 
         # Returns the list containing all networks names.
         return networks_names
 
-    def check_organization_device_serial_number(self, serial_number: str) -> bool:
+    def check_organization_device_serial_number(self, serial_number: str, organization_id: str = None) -> bool:
         """
         Checks if the serial number provided is present in the current working organization inventory
 
         :param serial_number: device serial number
+        :param organization_id: organization to look into, the currently-working organization is used if None
         :return:
         """
-        org_inventory = self._dashboard.organizations.getOrganizationInventory(self._org_id, total_pages=-1)
-        for row in org_inventory:
-            if row['serial'] == serial_number:
-                return True
-        return False
+        if organization_id is None:
+            organization_id = self._org_id
+
+        # Asks the Dashboard for this single device, a listing could be out of date
+        try:
+            self._dashboard.organizations.getOrganizationInventoryDevice(organization_id, serial_number)
+            return True
+
+        # The device isn't in the organization inventory
+        except meraki.APIError as e:
+            if e.status == 404:
+                return False
+            raise
 
-    def check_network_device_serial_number(self, serial_number: str) -> bool:
+    def check_network_device_serial_number(self, serial_number: str, network_id: str = None) -> bool:
         """
         Checks if the serial number provided is present in the current working network inventory
 
         :param serial_number: device serial number
+        :param network_id: network to look into, the currently-working network is used if None
         :return:
         """
-        org_inventory = self._dashboard.networks.getNetworkDevices(networkId=self._network_id)
-        for row in org_inventory:
-            if row['serial'] == serial_number:
-                return True
-        return False
+        if network_id is None:
+            network_id = self._network_id
+
+        # Asks the Dashboard for this single device, a listing could be out of date
+        try:
+            return self._dashboard.devices.getDevice(serial_number).get('networkId') == network_id
 
-    def update_device_primary_dns(self, serial_number: str, primary_dns: str):
+        # The device doesn't exist or isn't accessible with this API key
+        except meraki.APIError as e:
+            if e.status == 404:
+                return False
+            raise
+
+    def update_device_primary_dns(self, serial_number: str, primary_dns: str, read_policy: hedging.ReadPolicy = None):
         """
         Updates the device's primary DNS IP. This is only for the WAN1 interface.
 
         :param serial_number: device serial number
         :param primary_dns: primary DNS IP
+        :param read_policy: deadline and hedging of the bulk job the update belongs to, None outside of bulk jobs
         :return:
         """
 
         # Get the current device management interface configuration for WAN1 and saves it in wan1
-        self._wan1 = (self._dashboard.devices.getDeviceManagementInterface(serial=serial_number))['wan1']
+        # It is kept local so that bulk methods can update multiple devices at the same time
+        wan1 = self._get_device_wan1(serial_number=serial_number, read_policy=read_policy)
 
         # Changes the wan1 primary DNS IP
-        self._wan1['staticDns'][0] = primary_dns
+        wan1['staticDns'][0] = primary_dns
 
         # Update the device management interface with the new DNS IP
-        self._dashboard.devices.updateDeviceManagementInterface(serial=serial_number, wan1=self._wan1)
+        self._update_device_wan1(serial_number=serial_number, wan1=wan1, read_policy=read_policy)
 
-    def update_device_secondary_dns(self, serial_number: str, secondary_dns: str):
+    def update_device_secondary_dns(self, serial_number: str, secondary_dns: str,
+                                    read_policy: hedging.ReadPolicy = None):
         """
         Updates the device's secondary DNS IP. This is only for the WAN1 interface.
 
         :param serial_number: device serial number
         :param secondary_dns: secondary DNS IP
+        :param read_policy: deadline and hedging of the bulk job the update belongs to, None outside of bulk jobs
         :return:
         """
 
         # Get the current device management interface configuration for WAN1 and saves it in wan1
-        self._wan1 = (self._dashboard.devices.getDeviceManagementInterface(serial=serial_number))['wan1']
+        # It is kept local so that bulk methods can update multiple devices at the same time
+        wan1 = self._get_device_wan1(serial_number=serial_number, read_policy=read_policy)
 
         # Changes the wan1 secondary DNS IP
-        self._wan1['staticDns'][0] = secondary_dns
+        wan1['staticDns'][0] = secondary_dns
 
         # Update the device management interface with the new DNS IP
-        self._dashboard.devices.updateDeviceManagementInterface(serial=serial_number, wan1=self._wan1)
+        self._update_device_wan1(serial_number=serial_number, wan1=wan1, read_policy=read_policy)
 
-    def update_device_dns(self, serial_number: str, dns_list: list):
+    def update_device_dns(self, serial_number: str, dns_list: list, read_policy: hedging.ReadPolicy = None):
         """
         Updates the device's primary and secondary DNS IP. This is only for the WAN1 interface.
 
         :param serial_number: device serial number
         :param dns_list: list containing primary and secondary DNS IP. index 0 corresponds to primary DNS.
+        :param read_policy: deadline and hedging of the bulk job the update belongs to, None outside of bulk jobs
         :return:
         """
         # Get the current device management interface configuration for WAN1 and saves it in wan1
-        self._wan1 = (self._dashboard.devices.getDeviceManagementInterface(serial=serial_number))['wan1']
+        # It is kept local so that bulk methods can update multiple devices at the same time
+        wan1 = self._get_device_wan1(serial_number=serial_number, read_policy=read_policy)
 
         # Changes the wan1 primary and secondary DNS
-        self._wan1['staticDns'] = dns_list
+        wan1['staticDns'] = dns_list
 
         # Update the device management interface with the new DNS IP
-        self._dashboard.devices.updateDeviceManagementInterface(serial=serial_number, wan1=self._wan1)
+        self._update_device_wan1(serial_number=serial_number, wan1=wan1, read_policy=read_policy)
 
-    def update_network_static_devices_primary_dns(self, primary_dns: str):
+    def update_network_static_devices_primary_dns(self, primary_dns: str, network_id: str = None,
+                                                  read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
         """
         Updates the entire currently-working network static devices primary DNS configuration.
         This will only apply on devices using static IP.
 
         :param primary_dns: primary DNS IP
-        :return:
+        :param network_id: network to update, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
+        :return: report of the updated and failed devices, and of the concurrency the run settled on
         """
-
-        # Get all static IP devices serial number in the network
-        static_devices = self.get_network_devices_static()
-
-        # Iterates on the list
-        for serial_number in static_devices:
-            # Modify primary DNS
-            self.update_device_primary_dns(serial_number=serial_number, primary_dns=primary_dns)
-
-    def update_network_static_devices_secondary_dns(self, secondary_dns: str):
+        return self._update_network_static_devices(
+            lambda serial_number, policy: self.update_device_primary_dns(serial_number=serial_number,
+                                                                         primary_dns=primary_dns,
+                                                                         read_policy=policy),
+            network_id=network_id, read_policy=read_policy)
+
+    def update_network_static_devices_secondary_dns(self, secondary_dns: str, network_id: str = None,
+                                                    read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
         """
         Updates the entire currently-working network static devices secondary DNS configuration.
         This will only apply on devices using static IP.
 
         :param secondary_dns: secondary DNS IP
-        :return:
+        :param network_id: network to update, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
+        :return: report of the updated and failed devices, and of the concurrency the run settled on
         """
+        return self._update_network_static_devices(
+            lambda serial_number, policy: self.update_device_secondary_dns(serial_number=serial_number,
+                                                                           secondary_dns=secondary_dns,
+                                                                           read_policy=policy),
+            network_id=network_id, read_policy=read_policy)
+
+    def update_network_static_devices_dns(self, dns_list: list, network_id: str = None,
+                                          read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
+        """
+        Updates the entire currently-working network static devices DNS.
 
-        # Get all static IP devices serial number in the network
-        static_devices = self.get_network_devices_static()
-
-        # Iterates on the list
-        for serial_number in static_devices:
-            # Modify secondary DNS
-            self.update_device_secondary_dns(serial_number=serial_number, secondary_dns=secondary_dns)
+        :param dns_list: list containing primary and secondary DNS IP. index 0 corresponds to primary DNS.
+        :param network_id: network to update, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
+        :return: report of the updated and failed devices, and of the concurrency the run settled on
+        """
+        return self._update_network_static_devices(
+            lambda serial_number, policy: self.update_device_dns(serial_number=serial_number, dns_list=dns_list,
+                                                                 read_policy=policy),
+            network_id=network_id, read_policy=read_policy)
 
-    def update_network_static_devices_dns(self, dns_list: list):
+    def update_devices_dns(self, serial_numbers: list, dns_list: list,
+                           read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
         """
-        Updates the entire currently-working network static devices DNS.
+        Updates the DNS of the given devices, several devices at a time. This is only for the WAN1 interface.
 
+        :param serial_numbers: list of devices serial number
         :param dns_list: list containing primary and secondary DNS IP. index 0 corresponds to primary DNS.
-        :return:
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
+        :return: report of the updated and failed devices, and of the concurrency the run settled on
         """
-        # Get all static IP devices serial number in the network
-        static_devices = self.get_network_devices_static()
+        controller = self._new_concurrency_controller()
 
-        # Iterates on the list
-        for serial_number in static_devices:
-            # Modify DNS
-            self.update_device_dns(serial_number=serial_number, dns_list=dns_list)
+        with self._bulk_read_policy(read_policy) as policy:
+            # Modify DNS of every device, as many at a time as the controller allows
+            return self._run_bulk(controller, serial_numbers,
+                                  lambda serial_number: self.update_device_dns(serial_number=serial_number,
+                                                                               dns_list=dns_list, read_policy=policy))
 
-    def check_device_static(self, serial_number: str) -> bool:
+    def check_device_static(self, serial_number: str, read_policy: hedging.ReadPolicy = None) -> bool:
         """
         Checks if a device is in static IP configuration. Returns true if yes, false if no
 
         :param serial_number: device serial number
+        :param read_policy: deadline and hedging of the bulk job the check belongs to, None outside of bulk jobs
         :return:
         """
 
-        return (self._dashboard.devices.getDeviceManagementInterface(serial=serial_number))['wan1']['usingStaticIp']
+        return self._get_device_wan1(serial_number=serial_number, read_policy=read_policy)['usingStaticIp']
 
-    def get_network_devices_static(self) -> list:
+    def get_network_devices_static(self, controller: concurrency.AdaptiveConcurrencyController = None,
+                                   network_id: str = None, read_policy: hedging.ReadPolicy = None) -> list:
         """
         Retrieve all devices that have static IP configuration in the currently-working network
 
+        :param controller: adaptive concurrency controller used for the devices checks, a new one is created if None
+        :param network_id: network to look into, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
         :return: list of network devices serial number in static IP
         """
 
-        # Retrieve all network devices
-        devices_list = self._dashboard.networks.getNetworkDevices(networkId=self._network_id)
+        # Creates a controller if the caller doesn't share its own
+        if controller is None:
+            controller = self._new_concurrency_controller()
+
+        with self._bulk_read_policy(read_policy) as policy:
+            lookup = self._check_network_devices_static(controller=controller, network_id=network_id,
+                                                        read_policy=policy)
 
-        # Creates the return list
-        static_devices_sn_list = []
+        # Devices that couldn't be checked are left out
+        for serial_number, error in lookup.errors.items():
+            print(f'Cannot check if device {serial_number} uses a static IP: {error!r}')
+
+        # Returns the static IP devices contained in this network, in the listing order
+        return [serial_number for serial_number, is_static in lookup.results.items() if is_static]
+
+    def _check_network_devices_static(self, controller: concurrency.AdaptiveConcurrencyController,
+                                      network_id: str = None,
+                                      read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
+        """
+        Checks if each device of a network uses a static IP, several devices at a time.
+
+        :param controller: adaptive concurrency controller used for the devices checks
+        :param network_id: network to look into, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, the devices listing read included
+        :return: report whose results tell, for each checked device, if it uses a static IP
+        """
 
-        # Iterates on each devices_list elements
-        for device in devices_list:
-            # Check if the device is in static IP
-            if self.check_device_static(device['serial']):
-                # Adds it to the list
-                static_devices_sn_list.append(device['serial'])
+        # Retrieve all network devices serial number, straight from the Dashboard so no new device is missed
+        # The listing read has the job deadline too, a hanging listing raises DeadlineExceeded instead of stalling
+        serial_numbers = self._list_network_devices(network_id=network_id, read_policy=read_policy).serials()
+
+        # Check if each device is in static IP, as many at a time as the controller allows
+        return self._run_bulk(controller, serial_numbers,
+                              lambda serial_number: self.check_device_static(serial_number=serial_number,
+                                                                             read_policy=read_policy))
+
+    def _get_device_wan1(self, serial_number: str, read_policy: hedging.ReadPolicy = None) -> dict:
+        """
+        Reads the device management interface WAN1 configuration.
+        Within a bulk job, the read is sent once through the bulk client, with the job deadline and hedging.
+
+        :param serial_number: device serial number
+        :param read_policy: deadline and hedging of the bulk job the read belongs to, None outside of bulk jobs
+        :return:
+        """
+        if read_policy is None:
+            return self._dashboard.devices.getDeviceManagementInterface(serial=serial_number)['wan1']
+        return read_policy.call(self._bulk_client.get_management_interface, serial_number)['wan1']
+
+    def _update_device_wan1(self, serial_number: str, wan1: dict, read_policy: hedging.ReadPolicy = None):
+        """
+        Updates the device management interface WAN1 configuration.
+        Within a bulk job, the update is sent once through the bulk client, and retried by the bulk run.
+
+        :param serial_number: device serial number
+        :param wan1: new WAN1 configuration
+        :param read_policy: deadline and hedging of the bulk job the update belongs to, None outside of bulk jobs
+        :return:
+        """
+        if read_policy is None:
+            self._dashboard.devices.updateDeviceManagementInterface(serial=serial_number, wan1=wan1)
+        else:
+            self._bulk_client.update_management_interface(serial_number, wan1)
+
+    @contextlib.contextmanager
+    def _bulk_read_policy(self, read_policy: hedging.ReadPolicy = None):
+        """
+        Gives the read policy of a bulk job: the given one, or a new one made from the bulk settings
+        that is shut down at the end of the job.
+
+        :param read_policy: policy given by the caller, or None
+        :return:
+        """
+        if read_policy is not None:
+            yield read_policy
+            return
+
+        policy = hedging.ReadPolicy(max_workers=self._concurrency_settings['maximum'] * 2, **self._read_settings)
+        try:
+            yield policy
+        finally:
+            policy.shutdown()
+
+    def _update_network_static_devices(self, operation, network_id: str = None,
+                                       read_policy: hedging.ReadPolicy = None) -> models.BulkReport:
+        """
+        Runs the operation on every static IP device of a network, several devices at a time.
+
+        :param operation: function called with each static device serial number and the job read policy
+        :param network_id: network to update, the currently-working network is used if None
+        :param read_policy: deadline and hedging of this job reads, a policy is made from the bulk settings if None
+        :return: report of the updated and failed devices, and of the concurrency the run settled on
+        """
+
+        # Reads the working network once, so that the whole run targets the same network
+        # even if another thread changes the working network meanwhile
+        if network_id is None:
+            network_id = self._network_id
+
+        # One controller is used for the whole run, so it keeps what it learned from the static devices lookup
+        controller = self._new_concurrency_controller()
+
+        # One read policy too, so hedging learns the latencies of the whole run
+        with self._bulk_read_policy(read_policy) as policy:
+            # Checks which devices of the network use a static IP
+            lookup = self._check_network_devices_static(controller=controller, network_id=network_id,
+                                                        read_policy=policy)
+            static_devices = [serial_number for serial_number, is_static in lookup.results.items() if is_static]
+
+            # Runs the operation on every static device, as many at a time as the controller allows
+            report = self._run_bulk(controller, static_devices, lambda serial_number: operation(serial_number, policy))
+
+        # Devices that couldn't be checked are reported as failed too, without stopping the others
+        report.errors.update(lookup.errors)
+        return report
+
+    def _list_organizations(self) -> list:
+        """
+        Retrieve the organizations the API key has access to, as compact records.
+        The cached listing is returned if there is one, and revalidated in the background once it gets old.
+
+        :return: list of models.Organization
+        """
+        return self._cached_listing('organizations', '', self._fetch_organizations)
+
+    def _list_networks(self, organization_id: str = None) -> list:
+        """
+        Retrieve the networks of an organization, as compact records.
+        The cached listing is returned if there is one, and revalidated in the background once it gets old.
+
+        :param organization_id: organization to look into, the currently-working organization is used if None
+        :return: list of models.Network
+        """
+        if organization_id is None:
+            organization_id = self._org_id
+        return self._cached_listing('networks', organization_id, lambda: self._fetch_networks(organization_id))
+
+    def _list_network_devices(self, network_id: str = None,
+                              read_policy: hedging.ReadPolicy = None) -> models.DeviceListing:
+        """
+        Retrieve a network devices, as compact records.
+        It is always fetched from the Dashboard, so that bulk runs don't miss a new device.
+
+        :param network_id: network to look into, the currently-working network is used if None
+        :param read_policy: deadline and hedging applied to the listing read, None for a plain read
+        :return:
+        """
+        if network_id is None:
+            network_id = self._network_id
+        if read_policy is None:
+            return self._fetch_network_devices(network_id)
+        return read_policy.call(self._fetch_network_devices, network_id)
+
+    def _fetch_organizations(self) -> list:
+        """
+        Fetches the organizations the API key has access to from the Dashboard.
+
+        :return: list of models.Organization
+        """
+        return listings.fetch_records(self._dashboard,
+                                      {'tags': ['organizations', 'configure'], 'operation': 'getOrganizations'},
+                                      '/organizations', models.Organization.from_json)
+
+    def _fetch_networks(self, organization_id: str) -> list:
+        """
+        Fetches the networks of an organization from the Dashboard.
+
+        :param organization_id: organization to look into
+        :return: list of models.Network
+        """
+        return listings.fetch_records(self._dashboard,
+                                      {'tags': ['organizations', 'configure', 'networks'],
+                                       'operation': 'getOrganizationNetworks'},
+                                      f'/organizations/{organization_id}/networks', models.Network.from_json,
+                                      params={'perPage': NETWORKS_PAGE_SIZE})
+
+    def _fetch_network_devices(self, network_id: str, timeout: float = None) -> models.DeviceListing:
+        """
+        Fetches a network devices from the Dashboard.
+
+        :param network_id: network to look into
+        :param timeout: request timeout in seconds, None for the meraki library one
+        :return:
+        """
+        return models.DeviceListing(listings.fetch_records(
+            self._dashboard, {'tags': ['networks', 'configure', 'devices'], 'operation': 'getNetworkDevices'},
+            f'/networks/{network_id}/devices', models.Device.from_json, timeout=timeout))
+
+    def _cached_listing(self, kind: str, scope: str, fetch) -> list:
+        """
+        Returns a listing following the stale-while-revalidate strategy:
+        the cached listing is returned right away and, if it is older than LISTING_FRESHNESS seconds,
+        fetched again in the background to update the cache.
+        If the listing isn't cached, it is fetched and cached before being returned.
+
+        :param kind: listing kind, see TopologyCache
+        :param scope: organization ID the listing belongs to, empty for organizations
+        :param fetch: function fetching the listing from the Dashboard
+        :return:
+        """
+        cache = self._topology_cache
+
+        # Without cache, simply asks the Dashboard
+        if cache is None:
+            return fetch()
+
+        cached = cache.get(kind, scope)
+
+        # Nothing in the cache, fetches the listing now and saves it
+        if cached is None:
+            listing = fetch()
+            cache.update(kind, scope, listing)
+            return listing
+
+        # Uses the cached listing, and refreshes it for the next calls unless it was saved a moment ago
+        if time.time() - cache.updated_at(kind, scope) >= LISTING_FRESHNESS:
+            self._revalidate_in_background(cache, kind, scope, fetch)
+        return cached
+
+    def _revalidate_in_background(self, cache: topology_cache.TopologyCache, kind: str, scope: str, fetch):
+        """
+        Fetches a listing in a background thread and applies the differences to the cache.
+        The listings listener is told if the listing changed.
+
+        :param cache: cache to update
+        :param kind: listing kind, see TopologyCache
+        :param scope: organization or network ID the listing belongs to
+        :param fetch: function fetching the listing from the Dashboard
+        :return:
+        """
+        with self._revalidating_lock:
+            # This listing is already being revalidated
+            if (kind, scope) in self._revalidating:
+                return
+            self._revalidating.add((kind, scope))
+
+        def revalidate():
+            try:
+                changes = cache.update(kind, scope, fetch())
+
+                # Lets the pages showing this listing refresh it
+                listener = self._listings_listener
+                if changes and listener is not None:
+                    listener(kind, scope)
+
+            # A failed revalidation only means the cache stays as it is
+            except (meraki.APIError, sqlite3.Error) as e:
+                print(e)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard((kind, scope))
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    @staticmethod
+    def _open_topology_cache(api_key: str):
+        """
+        Opens the listings cache of an API key, or returns None if it can't be opened.
+
+        :param api_key:
+        :return:
+        """
+        try:
+            return topology_cache.TopologyCache(api_key)
+
+        # The application still works without cache, only slower
+        except (OSError, sqlite3.Error) as e:
+            print(e)
+            return None
+
+    def _new_concurrency_controller(self) -> concurrency.AdaptiveConcurrencyController:
+        """
+        Creates an adaptive concurrency controller with the current bulk concurrency settings.
+
+        :return:
+        """
+        return concurrency.AdaptiveConcurrencyController(**self._concurrency_settings)
+
+    @staticmethod
+    def _run_bulk(controller: concurrency.AdaptiveConcurrencyController, serial_numbers: list,
+                  operation) -> models.BulkReport:
+        """
+        Runs the operation on every serial number, keeping the in-flight requests under the controller limit.
+        Rate limited and server side failures are retried, other errors only fail their own device.
+
+        :param controller: adaptive concurrency controller of the bulk run
+        :param serial_numbers: list of devices serial number
+        :param operation: function called with each serial number
+        :return: report of the operation results and errors by serial number, in the same order as serial_numbers
+        """
 
-        # Returns the static IP devices contained in this network
-        return static_devices_sn_list
+        def run_in_slot(serial_number):
+            for attempt in range(1, BULK_MAXIMUM_ATTEMPTS + 1):
+                try:
+                    # Waits for a free slot, then times the operation for the controller
+                    with controller.slot():
+                        return operation(serial_number)
+                except meraki.APIError as e:
+                    # Only rate limiting, server errors and connection errors are worth another try
+                    if attempt == BULK_MAXIMUM_ATTEMPTS or (e.status is not None and e.status != 429
+                                                            and e.status < 500):
+                        raise
+
+                    # The bulk client doesn't wait by itself, so the delay is waited once, with the slot released
+                    time.sleep(retry_delay(e))
+
+        # Enough threads for the highest limit, the controller decides how many are really running
+        with ThreadPoolExecutor(max_workers=controller.maximum) as executor:
+            futures = {serial_number: executor.submit(run_in_slot, serial_number) for serial_number in serial_numbers}
+
+        report = models.BulkReport(concurrency=controller.limit)
+        for serial_number, future in futures.items():
+            if future.exception() is None:
+                report.results[serial_number] = future.result()
+            else:
+                report.errors[serial_number] = future.exception()
+        return report
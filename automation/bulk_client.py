@@ -0,0 +1,110 @@
+"""
+Dashboard requests of the bulk runs.
+
+The meraki library retries rate limited and failed requests by itself, sleeping between the attempts. Inside a bulk run
+this sleep would hold a concurrency slot, and the run would then wait a second time before its own retry. This client
+sends each request once on the library HTTP session and raises meraki.APIError right away, so the bulk run waits out
+each 429 once, outside of its slot, and its concurrency controller sees every rate limiting.
+"""
+
+import meraki
+import requests
+
+from automation import hedging
+
+
+class BulkClient:
+    """
+    **This class sends the Dashboard requests of the bulk runs, once each**
+
+    It shares the HTTP session, the headers and the shard of a meraki DashboardAPI, and only covers the endpoints
+    the bulk runs use. Every failure is raised as meraki.APIError, with a None status for connection errors,
+    and retrying is left to the bulk run.
+
+    ...
+
+    Attributes
+    ----------
+    _session : RestSession (private)
+        The meraki library session whose HTTP session and settings are used.
+
+    """
+
+    def __init__(self, dashboard):
+        self._session = dashboard._session
+
+    def get_management_interface(self, serial_number: str, timeout: float = None) -> dict:
+        """
+        Reads a device management interface.
+
+        :param serial_number: device serial number
+        :param timeout: request timeout in seconds, DeadlineExceeded is raised once it is reached. None for the
+                        meraki library timeout
+        :return:
+        """
+        return self._send({'tags': ['devices', 'configure', 'managementInterface'],
+                           'operation': 'getDeviceManagementInterface'},
+                          'GET', f'/devices/{serial_number}/managementInterface', timeout=timeout)
+
+    def update_management_interface(self, serial_number: str, wan1: dict) -> dict:
+        """
+        Updates a device management interface WAN1 configuration.
+
+        :param serial_number: device serial number
+        :param wan1: new WAN1 configuration
+        :return: the updated management interface
+        """
+        return self._send({'tags': ['devices', 'configure', 'managementInterface'],
+                           'operation': 'updateDeviceManagementInterface'},
+                          'PUT', f'/devices/{serial_number}/managementInterface', json={'wan1': wan1})
+
+    def _send(self, metadata: dict, method: str, url: str, timeout: float = None, **kwargs):
+        """
+        Sends a request once and decodes its answer.
+
+        :param metadata: meraki library metadata of the matching method, with its 'tags' and 'operation'
+        :param method: HTTP method
+        :param url: endpoint path, like '/devices/Q2XX-XXXX-XXXX/managementInterface'
+        :param timeout: request timeout in seconds, DeadlineExceeded is raised once it is reached. None for the
+                        meraki library timeout
+        :param kwargs: other requests arguments, like 'json'
+        :return: the decoded body, None if it is empty
+        """
+        rest_session = self._session
+
+        # Same request options as the meraki library
+        kwargs['timeout'] = timeout if timeout is not None else rest_session._single_request_timeout
+        if rest_session._certificate_path:
+            kwargs['verify'] = rest_session._certificate_path
+        if rest_session._requests_proxy:
+            kwargs['proxies'] = {'https': rest_session._requests_proxy}
+
+        abs_url = rest_session._base_url + url
+        while True:
+            try:
+                response = rest_session._req_session.request(method, abs_url, allow_redirects=False, **kwargs)
+
+            # The caller's own timeout is a deadline, not a failure to retry
+            except requests.exceptions.Timeout:
+                if timeout is not None:
+                    raise hedging.DeadlineExceeded(f'{metadata["operation"]} took more than {timeout} seconds')
+                raise meraki.APIError(metadata, None)
+            except requests.exceptions.RequestException:
+                raise meraki.APIError(metadata, None)
+
+            # Follows the redirects to the organization shard, and keeps using it like the meraki library does
+            if 300 <= response.status_code < 400:
+                abs_url = response.headers['Location']
+                substring = 'meraki.com/api/v' if 'meraki.com/api/v' in abs_url else 'meraki.cn/api/v'
+                rest_session._base_url = abs_url[:abs_url.find(substring) + len(substring) + 1]
+                continue
+
+            try:
+                # Rate limiting, server and client errors are all left to the caller
+                if not response.ok:
+                    raise meraki.APIError(metadata, response)
+                return response.json() if response.content.strip() else None
+            except ValueError:
+                raise meraki.APIError(metadata, response)
+            finally:
+                response.close()
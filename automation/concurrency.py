@@ -0,0 +1,213 @@
+import contextlib
+import math
+import threading
+import time
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Returns the given percentile of a list of samples using the nearest-rank method.
+
+    :param samples: list of numbers
+    :param fraction: wanted percentile between 0 and 1, 0.95 corresponds to the p95
+    :return:
+    """
+
+    # No samples means no latency information
+    if not samples:
+        return 0.0
+
+    # Sorts the samples and picks the nearest rank
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class AdaptiveConcurrencyController:
+    """
+    **This class was made to find the fastest safe number of in-flight Dashboard requests**
+
+    It follows an AIMD (additive increase, multiplicative decrease) strategy:
+    while latency and error rates look healthy, the concurrency limit is raised by a fixed step after each
+    completed window of requests. As soon as a request is rate limited (HTTP 429), the error rate rises
+    or the window p95 latency drifts above the reference p95, the limit is multiplied by a back off factor.
+    The reference p95 follows the fastest windows right away and slowly catches up with slower ones,
+    so a single lucky window can't keep the limit low for the rest of the run.
+
+    ...
+
+    Attributes
+    ----------
+    limit : int
+        The current number of requests allowed to be in flight at the same time.
+
+    minimum : int
+        The limit will never go below this value.
+
+    maximum : int
+        The limit will never go above this value.
+
+    increase_step : int
+        Number of slots added to the limit after a healthy window.
+
+    decrease_factor : float
+        The limit is multiplied by this factor when backing off.
+
+    latency_tolerance : float
+        A window is considered slow if its p95 latency is higher than the reference p95 multiplied by this value.
+
+    baseline_decay : float
+        Fraction of the gap closed by the reference p95 when a window is slower than it, between 0 and 1.
+
+    error_rate_threshold : float
+        A window is considered unhealthy if its error rate is higher than this value.
+
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16, increase_step: int = 1,
+                 decrease_factor: float = 0.5, latency_tolerance: float = 1.5, error_rate_threshold: float = 0.1,
+                 baseline_decay: float = 0.2):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError('Concurrency values must respect 1 <= minimum <= initial <= maximum')
+
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.error_rate_threshold = error_rate_threshold
+        self.baseline_decay = baseline_decay
+
+        # Requests currently running
+        self._in_flight = 0
+
+        # Samples collected during the current window
+        self._latencies = []
+        self._errors = 0
+
+        # Reference p95 latency, used to tell if latency is rising
+        self._baseline_p95 = None
+
+        # Increased each time the limit changes, so that requests started under an older limit
+        # can't make the controller back off a second time for the same congestion
+        self._generation = 0
+
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Returns the number of requests currently running.
+
+        :return:
+        """
+        with self._condition:
+            return self._in_flight
+
+    def acquire(self) -> int:
+        """
+        Waits until a request slot is available and takes it.
+
+        :return: the controller generation the slot was taken under, that needs to be given back to 'release'
+        """
+        with self._condition:
+            # Waits while every allowed slot is already used
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+
+            self._in_flight += 1
+            return self._generation
+
+    def release(self, generation: int, latency: float, throttled: bool = False, failed: bool = False):
+        """
+        Gives back a request slot and feeds the request outcome to the controller.
+
+        :param generation: value returned by 'acquire' for this request
+        :param latency: request duration in seconds
+        :param throttled: True if the Dashboard answered with a 429
+        :param failed: True if the request failed for any other reason
+        :return:
+        """
+        with self._condition:
+            self._in_flight -= 1
+
+            # Rate limiting is the clearest overload signal, backs off right away
+            if throttled:
+                if generation == self._generation:
+                    self._decrease()
+
+            # Only requests started under the current limit tell something about it
+            elif generation == self._generation:
+                self._latencies.append(latency)
+                if failed:
+                    self._errors += 1
+
+                # Once a full window of requests completed, decides if the limit can grow
+                if len(self._latencies) >= self.limit:
+                    self._end_window()
+
+            # Wakes up the threads waiting for a slot, the limit may also have changed
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """
+        Context manager taking a request slot, timing the wrapped request and releasing the slot.
+        Exceptions having a 'status' attribute equal to 429, like meraki.APIError, are reported as throttling.
+
+        :return:
+        """
+        generation = self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            throttled = getattr(e, 'status', None) == 429
+            self.release(generation, time.monotonic() - start, throttled=throttled, failed=not throttled)
+            raise
+        self.release(generation, time.monotonic() - start)
+
+    def _end_window(self):
+        """
+        Applies the AIMD rule on the window that just completed. Must be called with the condition held.
+
+        :return:
+        """
+        window_p95 = percentile(self._latencies, 0.95)
+        error_rate = self._errors / len(self._latencies)
+        slow = self._baseline_p95 is not None and window_p95 > self._baseline_p95 * self.latency_tolerance
+
+        # Moves the reference: down to a faster window right away, up to a slower one little by little
+        if self._baseline_p95 is None or window_p95 < self._baseline_p95:
+            self._baseline_p95 = window_p95
+        else:
+            self._baseline_p95 += self.baseline_decay * (window_p95 - self._baseline_p95)
+
+        # Latency went up too much or too many requests failed, backs off
+        if error_rate > self.error_rate_threshold or slow:
+            self._decrease()
+
+        # Healthy window, probes one step higher
+        else:
+            self._set_limit(self.limit + self.increase_step)
+
+    def _decrease(self):
+        """
+        Multiplies the limit by the back off factor. Must be called with the condition held.
+
+        :return:
+        """
+        self._set_limit(int(self.limit * self.decrease_factor))
+
+    def _set_limit(self, limit: int):
+        """
+        Sets a new limit within the bounds and starts a new window. Must be called with the condition held.
+
+        :param limit:
+        :return:
+        """
+        self.limit = max(self.minimum, min(self.maximum, limit))
+        self._latencies = []
+        self._errors = 0
+        self._generation += 1
@@ -0,0 +1,201 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from automation import concurrency
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a Dashboard read didn't answer before its deadline.
+    """
+
+
+class ReadPolicy:
+    """
+    **This class was made to keep a few slow Dashboard reads from stalling a whole bulk job**
+
+    Each read is run on the policy thread pool:
+
+    * If a deadline is set, the read is abandoned with DeadlineExceeded once it is reached.
+    * If hedging is enabled, a read still running after the chosen latency percentile of the previous reads
+      gets a duplicate request, and the first answer wins. Only idempotent GET requests should be hedged.
+      The number of duplicates is capped to a fraction of the reads.
+
+    A policy is meant to be used by a single bulk job, since it learns the latencies of that job.
+    Reads get the time left before the deadline as their request timeout, so abandoned requests don't keep
+    loading the Dashboard nor holding a thread of the pool.
+
+    ...
+
+    Attributes
+    ----------
+    deadline : float
+        Maximum duration of a read in seconds, None for no deadline.
+
+    hedge_percentile : float
+        Latency percentile after which a duplicate is sent, between 0 and 1. None disables hedging.
+
+    hedge_budget : float
+        Maximum number of duplicates, as a fraction of the reads.
+
+    min_samples : int
+        Number of reads to observe before hedging, so the percentile means something.
+
+    """
+
+    def __init__(self, deadline: float = None, hedge_percentile: float = None, hedge_budget: float = 0.1,
+                 min_samples: int = 20, max_workers: int = 32):
+        if deadline is not None and deadline <= 0:
+            raise ValueError('The deadline must be a positive number of seconds')
+        if hedge_percentile is not None and not 0 < hedge_percentile < 1:
+            raise ValueError('The hedge percentile must be between 0 and 1')
+        if not 0 <= hedge_budget <= 1:
+            raise ValueError('The hedge budget must be between 0 and 1')
+
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.min_samples = min_samples
+
+        # Latencies of the last successful reads
+        self._latencies = []
+        self._reads = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @property
+    def hedges(self) -> int:
+        """
+        Returns the number of duplicate requests sent so far.
+
+        :return:
+        """
+        with self._lock:
+            return self._hedges
+
+    def call(self, read, *args, **kwargs):
+        """
+        Runs a Dashboard read with the policy deadline and hedging.
+        When a deadline is set, the read is given the time it has left as a 'timeout' keyword argument,
+        so that it can pass it to its HTTP request and free its thread once the deadline is reached.
+        The deadline counts from the moment the read actually starts, not from the time it waits for a thread.
+
+        :param read: function doing the request, accepting a 'timeout' keyword argument if a deadline is set
+        :param args: read arguments
+        :param kwargs: read keyword arguments
+        :return: the read result
+        """
+
+        # Without deadline nor hedging, there is no reason to go through the thread pool
+        if self.deadline is None and self.hedge_percentile is None:
+            return read(*args, **kwargs)
+
+        started = threading.Event()
+        timing = {}
+
+        def primary():
+            # Starts the clock only once a thread runs the read
+            timing['start'] = time.monotonic()
+            started.set()
+            return read(*args, **self._with_timeout(kwargs, self.deadline))
+
+        pending = {self._executor.submit(primary)}
+        started.wait()
+        start = timing['start']
+        end = None if self.deadline is None else start + self.deadline
+
+        try:
+            # Waits for the primary request until the hedge delay, then sends a duplicate if still allowed
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None and (end is None or start + hedge_delay < end):
+                done, pending = wait(pending, timeout=max(0.0, start + hedge_delay - time.monotonic()))
+                if not done and self._take_hedge():
+                    remaining = None if end is None else end - time.monotonic()
+                    pending.add(self._executor.submit(read, *args, **self._with_timeout(kwargs, remaining)))
+                pending |= done
+
+            # Returns the first successful answer, or raises the last error if every request failed
+            error = None
+            while pending:
+                timeout = None if end is None else max(0.0, end - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                # Nothing answered before the deadline
+                if not done:
+                    raise DeadlineExceeded(f'Dashboard read took more than {self.deadline} seconds')
+
+                for future in done:
+                    if future.exception() is None:
+                        self._record(time.monotonic() - start)
+                        return future.result()
+                    error = future.exception()
+
+            raise error
+
+        finally:
+            # A duplicate that didn't start yet isn't needed anymore
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        """
+        Releases the policy thread pool without waiting for abandoned requests.
+
+        :return:
+        """
+        self._executor.shutdown(wait=False)
+
+    @staticmethod
+    def _with_timeout(kwargs: dict, timeout: float) -> dict:
+        """
+        Returns the read keyword arguments with the given timeout, or unchanged if there is no deadline.
+
+        :param kwargs: read keyword arguments
+        :param timeout: seconds left before the deadline, None if there is no deadline
+        :return:
+        """
+        if timeout is None:
+            return kwargs
+        return dict(kwargs, timeout=max(0.001, timeout))
+
+    def _hedge_delay(self):
+        """
+        Returns how long to wait before hedging a read, or None if it must not be hedged.
+
+        :return:
+        """
+        if self.hedge_percentile is None:
+            return None
+
+        with self._lock:
+            self._reads += 1
+            if len(self._latencies) < self.min_samples:
+                return None
+            return concurrency.percentile(self._latencies, self.hedge_percentile)
+
+    def _take_hedge(self) -> bool:
+        """
+        Counts a duplicate request if the hedge budget allows it.
+
+        :return: True if the duplicate can be sent
+        """
+        with self._lock:
+            if self._hedges + 1 > self._reads * self.hedge_budget:
+                return False
+            self._hedges += 1
+            return True
+
+    def _record(self, latency: float):
+        """
+        Saves the latency of a successful read, keeping only the most recent ones.
+
+        :param latency: read duration in seconds
+        :return:
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            if len(self._latencies) > 1000:
+                del self._latencies[:-1000]
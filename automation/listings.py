@@ -0,0 +1,71 @@
+"""
+Fetching of the Dashboard listings used by AutomationCore.
+
+Big organizations listings are multi-megabyte JSON payloads. They are asked compressed, and instead of keeping the raw
+dicts of every page until the end like the meraki library paginated methods, each page is turned into compact records
+as soon as it arrives.
+"""
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accept_encoding() -> str:
+    """
+    Returns the compressions this installation can decode, for the Accept-Encoding header.
+
+    :return:
+    """
+    # urllib3 decodes brotli only when the brotli package is installed
+    if brotli is not None:
+        return 'gzip, deflate, br'
+    return 'gzip, deflate'
+
+
+def enable_compression(dashboard):
+    """
+    Asks the Dashboard for compressed responses.
+    The meraki library replaces the default requests headers, so responses aren't compressed otherwise.
+
+    :param dashboard: meraki DashboardAPI
+    :return:
+    """
+    dashboard._session._req_session.headers['Accept-Encoding'] = accept_encoding()
+
+
+def fetch_records(dashboard, metadata: dict, url: str, from_json, params: dict = None, timeout: float = None) -> list:
+    """
+    Fetches every page of a listing and converts each row with from_json as soon as its page arrives,
+    so only one page of raw dicts is in memory at a time.
+    Pages are requested with the meraki library 'request' method, which handles redirects, rate limiting and retries.
+    The library page iterator ('use_iterator_for_get_pages') isn't used, since version 1.10 drops the last page rows.
+
+    :param dashboard: meraki DashboardAPI
+    :param metadata: meraki library metadata of the matching method, with its 'tags' and 'operation'
+    :param url: endpoint path, like '/organizations/123/networks'
+    :param from_json: function converting a row to a record, like models.Network.from_json
+    :param params: query parameters of the first page
+    :param timeout: timeout of each page request in seconds, None for the meraki library one
+    :return: list of records, in the listing order
+    """
+    rest_session = dashboard._session
+    records = []
+
+    # The library sets its own timeout only if none is given
+    kwargs = {} if timeout is None else {'timeout': timeout}
+
+    # Follows the 'next' links of the paginated endpoints, non paginated ones simply have none
+    response = rest_session.request(dict(metadata), 'GET', url, params=params, **kwargs)
+    while True:
+        try:
+            rows = response.json() if response.content.strip() else []
+            next_page = response.links.get('next')
+        finally:
+            response.close()
+
+        records.extend(from_json(row) for row in rows)
+        if next_page is None:
+            return records
+        response = rest_session.request(dict(metadata), 'GET', next_page['url'], **kwargs)
@@ -0,0 +1,150 @@
+"""
+Compact records for the Dashboard listings used by AutomationCore.
+
+The Dashboard returns dozens of fields for each organization, network or device, when the automation only reads a few
+of them. These classes keep only the needed fields in '__slots__' records, so big listings use much less memory than
+the raw JSON dicts.
+"""
+
+
+class Organization:
+    """
+    An organization the API key has access to.
+    """
+
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id: str, name: str):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_json(cls, row: dict) -> 'Organization':
+        """
+        Creates the record from a 'getOrganizations' row, ignoring unused fields.
+
+        :param row: organization dict returned by the Dashboard
+        :return:
+        """
+        return cls(row['id'], row['name'])
+
+    def __repr__(self):
+        return f'Organization(id={self.id!r}, name={self.name!r})'
+
+
+class Network:
+    """
+    A network of the working organization.
+    """
+
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id: str, name: str):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_json(cls, row: dict) -> 'Network':
+        """
+        Creates the record from a 'getOrganizationNetworks' row, ignoring unused fields.
+
+        :param row: network dict returned by the Dashboard
+        :return:
+        """
+        return cls(row['id'], row['name'])
+
+    def __repr__(self):
+        return f'Network(id={self.id!r}, name={self.name!r})'
+
+
+class Device:
+    """
+    A device of a network. Bulk runs only need its serial number.
+    """
+
+    __slots__ = ('serial',)
+
+    def __init__(self, serial: str):
+        self.serial = serial
+
+    @classmethod
+    def from_json(cls, row: dict) -> 'Device':
+        """
+        Creates the record from a 'getNetworkDevices' row, ignoring unused fields.
+
+        :param row: device dict returned by the Dashboard
+        :return:
+        """
+        return cls(row['serial'])
+
+    def __repr__(self):
+        return f'Device(serial={self.serial!r})'
+
+
+class DeviceListing:
+    """
+    An ordered, read-only list of devices.
+    """
+
+    __slots__ = ('_devices',)
+
+    def __init__(self, devices):
+        self._devices = tuple(devices)
+
+    @classmethod
+    def from_json(cls, rows) -> 'DeviceListing':
+        """
+        Creates the listing from the rows of a device listing, ignoring unused fields.
+
+        :param rows: iterable of device dicts returned by the Dashboard
+        :return:
+        """
+        return cls(Device.from_json(row) for row in rows)
+
+    def serials(self) -> list:
+        """
+        Returns the serial numbers of the listing, in the listing order.
+
+        :return:
+        """
+        return [device.serial for device in self._devices]
+
+    def __iter__(self):
+        return iter(self._devices)
+
+    def __len__(self):
+        return len(self._devices)
+
+
+class BulkReport:
+    """
+    The outcome of a bulk run: the result or the error of each device, and the concurrency the run settled on.
+    """
+
+    __slots__ = ('concurrency', 'results', 'errors')
+
+    def __init__(self, concurrency: int, results: dict = None, errors: dict = None):
+        self.concurrency = concurrency
+        self.results = results if results is not None else {}
+        self.errors = errors if errors is not None else {}
+
+    @property
+    def succeeded(self) -> list:
+        """
+        Returns the serial numbers of the devices the operation worked on.
+
+        :return:
+        """
+        return list(self.results)
+
+    @property
+    def failed(self) -> list:
+        """
+        Returns the serial numbers of the devices the operation failed or was skipped on.
+
+        :return:
+        """
+        return list(self.errors)
+
+    def __repr__(self):
+        return f'BulkReport(concurrency={self.concurrency!r}, succeeded={len(self.results)}, failed={len(self.errors)})'
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from automation import models
+
+
+def user_cache_dir() -> str:
+    """
+    Returns this application cache folder, following each platform convention.
+
+    :return:
+    """
+
+    # Windows keeps caches in the local application data
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+
+    # macOS has a dedicated caches folder
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+
+    # Other systems follow the XDG specification
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+
+    return os.path.join(base, 'meraki-automation-dns')
+
+
+class TopologyCache:
+    """
+    **This class keeps the Dashboard listings on disk between two launches**
+
+    The organizations and networks listings are saved in a SQLite database, one database per API key.
+    The file name is a hash of the API key, so the key itself is never written on disk.
+    Listings are saved as incremental diffs: only added, changed or removed records are written.
+    The listing order is saved apart from the records, so a record moving in the listing isn't rewritten.
+
+    ...
+
+    Attributes
+    ----------
+    path : str
+        The SQLite database file path.
+
+    """
+
+    # Version of the database layout, an older database is emptied and created again
+    SCHEMA_VERSION = 2
+
+    # For each listing kind, how to convert a record to a (key, name) row and back
+    _KINDS = {
+        'organizations': (lambda record: (record.id, record.name), models.Organization),
+        'networks': (lambda record: (record.id, record.name), models.Network),
+    }
+
+    def __init__(self, api_key: str, directory: str = None):
+        if directory is None:
+            directory = user_cache_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        # Only a hash of the key is used to name the database
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]
+        self.path = os.path.join(directory, f'topology-{key_hash}.sqlite3')
+
+        # The connection is shared with the background revalidation threads, so every use is locked
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            # The cache only holds copies of Dashboard data, so an older layout is simply dropped
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                self._connection.execute('DROP TABLE IF EXISTS listings')
+                self._connection.execute('DROP TABLE IF EXISTS records')
+                self._connection.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+            self._connection.execute('CREATE TABLE IF NOT EXISTS listings ('
+                                     'kind TEXT NOT NULL, scope TEXT NOT NULL, keys TEXT NOT NULL, '
+                                     'updated_at REAL NOT NULL, PRIMARY KEY (kind, scope))')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS records ('
+                                     'kind TEXT NOT NULL, scope TEXT NOT NULL, key TEXT NOT NULL, name TEXT, '
+                                     'PRIMARY KEY (kind, scope, key))')
+
+    def get(self, kind: str, scope: str = '') -> list:
+        """
+        Returns a saved listing, or None if this listing was never saved.
+
+        :param kind: 'organizations' or 'networks'
+        :param scope: organization ID for networks, empty for organizations
+        :return: list of records, in the listing order
+        """
+        record_class = self._KINDS[kind][1]
+
+        with self._lock:
+            # A listing saved empty is still a known listing, so the listings table is checked first
+            listing = self._connection.execute('SELECT keys FROM listings WHERE kind = ? AND scope = ?',
+                                               (kind, scope)).fetchone()
+            if listing is None:
+                return None
+
+            names = dict(self._connection.execute('SELECT key, name FROM records WHERE kind = ? AND scope = ?',
+                                                  (kind, scope)))
+
+        return [record_class(key, names[key]) for key in json.loads(listing[0])]
+
+    def updated_at(self, kind: str, scope: str = '') -> float:
+        """
+        Returns when a listing was last saved, as a time.time() timestamp, or None if it was never saved.
+
+        :param kind: 'organizations' or 'networks'
+        :param scope: organization ID for networks, empty for organizations
+        :return:
+        """
+        with self._lock:
+            listing = self._connection.execute('SELECT updated_at FROM listings WHERE kind = ? AND scope = ?',
+                                               (kind, scope)).fetchone()
+        return None if listing is None else listing[0]
+
+    def update(self, kind: str, scope: str, records: list) -> int:
+        """
+        Saves a listing by applying only the differences with the saved one.
+
+        :param kind: 'organizations' or 'networks'
+        :param scope: organization ID for networks, empty for organizations
+        :param records: list of records, in the listing order
+        :return: the number of added, changed or removed records
+        """
+        to_row = self._KINDS[kind][0]
+
+        # Builds the new listing rows, indexed by key, and the listing order
+        new_rows = dict(to_row(record) for record in records)
+        keys = json.dumps([to_row(record)[0] for record in records])
+
+        with self._lock, self._connection:
+            old_rows = dict(self._connection.execute('SELECT key, name FROM records WHERE kind = ? AND scope = ?',
+                                                     (kind, scope)))
+
+            # Records that disappeared from the Dashboard
+            removed = [(kind, scope, key) for key in old_rows.keys() - new_rows.keys()]
+
+            # Records that are new or whose name changed
+            changed = [(kind, scope, key, name) for key, name in new_rows.items()
+                       if key not in old_rows or old_rows[key] != name]
+
+            self._connection.executemany('DELETE FROM records WHERE kind = ? AND scope = ? AND key = ?', removed)
+            self._connection.executemany('INSERT OR REPLACE INTO records (kind, scope, key, name) VALUES (?, ?, ?, ?)',
+                                         changed)
+
+            # The order is a single value of the listing, whatever the number of records that moved
+            self._connection.execute('INSERT OR REPLACE INTO listings (kind, scope, keys, updated_at) '
+                                     'VALUES (?, ?, ?, ?)', (kind, scope, keys, time.time()))
+
+        return len(removed) + len(changed)
+
+    def close(self):
+        """
+        Closes the database connection.
+
+        :return:
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,181 @@
+"""
+This file compares the former and current ways of fetching the listings AutomationCore uses: the networks of a big
+synthetic organization, and the devices of a big synthetic network.
+
+    python benchmarks/listing_parse.py [number of networks] [number of devices]
+
+Both ways go through a real meraki DashboardAPI whose HTTP session is replaced by a local one serving the listings,
+and gzip compressing them when the request accepts it. No network is involved, so only the transferred bytes show what
+compression saves on the wire.
+
+The former way is the meraki library methods: uncompressed pages, and all the raw dicts kept until the end. The current
+way is the AutomationCore fetching methods: compressed transfer, and each page turned into compact records right away.
+"""
+
+import gc
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import urllib.parse
+
+import meraki
+import requests
+import urllib3
+
+# Lets the script be launched from the project folder or from this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation import listings
+from automation.automation_core import AutomationCore
+
+ORGANIZATION_ID = '1'
+NETWORK_ID = 'L_1'
+DEFAULT_PAGE_SIZE = 1000
+
+
+class LocalHttpSession:
+    """
+    Serves the synthetic listings like the Dashboard would, following the perPage parameter and the Accept-Encoding
+    header.
+    """
+
+    def __init__(self, networks: list, devices: list):
+        self.headers = {}
+        self.listings = {f'/api/v1/organizations/{ORGANIZATION_ID}/networks': networks,
+                         f'/api/v1/networks/{NETWORK_ID}/devices': devices}
+        self.adapter = requests.adapters.HTTPAdapter()
+        self.transferred = 0
+        self.requests = 0
+
+    def request(self, method, url, params=None, **kwargs):
+        parsed = urllib.parse.urlparse(url)
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        query.update(params or {})
+        rows = self.listings[parsed.path]
+
+        # Only the networks listing is paginated
+        headers = {'Content-Type': 'application/json'}
+        if parsed.path.endswith('/networks'):
+            page_size = int(query.get('perPage', DEFAULT_PAGE_SIZE))
+            start = int(query.get('startingAfter', 0))
+            if start + page_size < len(rows):
+                headers['Link'] = (f'<https://api.meraki.com{parsed.path}?perPage={page_size}'
+                                   f'&startingAfter={start + page_size}>; rel=next')
+            rows = rows[start:start + page_size]
+        body = json.dumps(rows).encode('utf-8')
+
+        # Compresses only if the client asked for it, urllib3 then decodes it like a real response
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        self.transferred += len(body)
+        self.requests += 1
+
+        raw = urllib3.HTTPResponse(body=io.BytesIO(body), headers=headers, status=200, preload_content=False,
+                                   decode_content=True)
+        return self.adapter.build_response(requests.Request(method, url, params=params).prepare(), raw)
+
+
+def synthetic_networks(networks_count: int) -> list:
+    """
+    Builds networks rows shaped like the Dashboard ones, with many fields the automation never reads.
+
+    :param networks_count: number of networks of the organization
+    :return:
+    """
+    return [dict(id=f'L_{i}', organizationId=ORGANIZATION_ID, name=f'Branch {i:05d}',
+                 productTypes=['appliance', 'switch', 'wireless'], timeZone='Europe/Paris', tags=['branch', 'static'],
+                 enrollmentString=None, url=f'https://n1.meraki.com/Branch-{i}/n/abc{i}/manage/usage/list',
+                 notes='Opened in 2021', isBoundToConfigTemplate=False)
+            for i in range(networks_count)]
+
+
+def synthetic_devices(devices_count: int) -> list:
+    """
+    Builds network devices rows shaped like the Dashboard ones, with many fields the automation never reads.
+
+    :param devices_count: number of devices of the network
+    :return:
+    """
+    return [dict(serial=f'Q2XX-{i:04X}-{i * 7 % 65536:04X}', name=f'device-{i}', model='MR46',
+                 mac=f'00:18:0a:{i >> 16 & 0xff:02x}:{i >> 8 & 0xff:02x}:{i & 0xff:02x}', networkId=NETWORK_ID,
+                 lat=48.8566, lng=2.3522, address='1 rue de Rivoli, Paris', notes='', tags=['floor-1'],
+                 lanIp=f'10.0.{i >> 8 & 0xff}.{i & 0xff}', firmware='wireless-29-5-1', floorPlanId=None,
+                 url=f'https://n1.meraki.com/Branch-1/n/abc/manage/nodes/new_list/{i}',
+                 details=[dict(name='Catalyst serial', value='')])
+            for i in range(devices_count)]
+
+
+def new_automation(networks: list, devices: list, compression: bool) -> AutomationCore:
+    """
+    Creates an AutomationCore on a real DashboardAPI using the local HTTP session.
+
+    :param networks: networks rows
+    :param devices: network devices rows
+    :param compression: if True, asks for compressed responses like set_working_api_key does
+    :return:
+    """
+    automation = AutomationCore()
+    automation._dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True)
+    automation._dashboard._session._req_session = LocalHttpSession(networks, devices)
+    if compression:
+        listings.enable_compression(automation._dashboard)
+    return automation
+
+
+# Former and current way of fetching each listing
+FETCHES = {
+    'networks': (lambda automation: automation._dashboard.organizations.getOrganizationNetworks(ORGANIZATION_ID,
+                                                                                                total_pages=-1),
+                 lambda automation: automation._fetch_networks(ORGANIZATION_ID)),
+    'network devices': (lambda automation: automation._dashboard.networks.getNetworkDevices(NETWORK_ID),
+                        lambda automation: automation._list_network_devices(NETWORK_ID)),
+}
+
+
+def measure(fetch, automation: AutomationCore) -> tuple:
+    """
+    Measures the fetching time, the memory used, the bytes transferred and the number of requests.
+
+    :param fetch: fetching function
+    :param automation: AutomationCore using the local HTTP session
+    :return: fetching seconds, peak memory in MB, kept memory in MB, transferred MB, number of requests
+    """
+    http_session = automation._dashboard._session._req_session
+
+    # Time is measured without tracemalloc, which slows allocations down a lot
+    gc.collect()
+    start = time.perf_counter()
+    fetch(automation)
+    fetch_time = time.perf_counter() - start
+
+    http_session.transferred = 0
+    http_session.requests = 0
+    gc.collect()
+    tracemalloc.start()
+    listing = fetch(automation)
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del listing
+
+    return fetch_time, peak / 2 ** 20, kept / 2 ** 20, http_session.transferred / 2 ** 20, http_session.requests
+
+
+if __name__ == "__main__":
+
+    networks_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    devices_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    networks, devices = synthetic_networks(networks_count), synthetic_devices(devices_count)
+
+    print(f'{networks_count} networks, {devices_count} network devices')
+    for listing_name, (former_fetch, current_fetch) in FETCHES.items():
+        print(listing_name)
+        for label, fetch, compression in (('former', former_fetch, False), ('current', current_fetch, True)):
+            fetch_time, peak, kept, transferred, requests_count = measure(fetch, new_automation(networks, devices,
+                                                                                                compression))
+            print(f'{label:>10}: fetch {fetch_time:.3f} s, peak {peak:.1f} MB, kept {kept:.1f} MB, '
+                  f'transferred {transferred:.2f} MB in {requests_count} requests')
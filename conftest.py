@@ -0,0 +1 @@
+# Makes the project packages importable from the tests, whatever folder pytest is launched from
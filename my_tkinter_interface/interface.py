@@ -1,3 +1,4 @@
+import queue
 import tkinter as tk
 from tkinter import *
 from automation import automation_core
@@ -23,6 +24,11 @@ class ProjectApp(tk.Tk):
         # The AutomationCore variable used in all pages
         self.automation = automation_core.AutomationCore()
 
+        # Listings refreshed in the background are queued by the revalidation threads,
+        # and applied to the pages by the Tk thread, the only one allowed to touch the widgets
+        self.changed_listings = queue.SimpleQueue()
+        self.automation.set_listings_listener(lambda kind, scope: self.changed_listings.put(kind))
+
         # the container is where we'll stack a bunch of frames
         # on top of each other, then the one we want visible
         # will be raised above the others
@@ -47,6 +53,9 @@ class ProjectApp(tk.Tk):
         # Shows the starting application page
         self.show_frame("StartPage")
 
+        # Starts checking for listings refreshed in the background
+        self.after(500, self.refresh_changed_listings)
+
     def show_frame(self, page_name: str):
         """
          Show a frame for the given page name
@@ -57,6 +66,23 @@ class ProjectApp(tk.Tk):
         frame = self.get_page(page_name)
         frame.tkraise()
 
+    def refresh_changed_listings(self):
+        """
+        Refreshes the comboBoxes whose listing changed in the background, then checks again later
+
+        :return:
+        """
+        changed_kinds = set()
+        while not self.changed_listings.empty():
+            changed_kinds.add(self.changed_listings.get())
+
+        if 'organizations' in changed_kinds:
+            self.get_page('OrganizationPage').refresh_combo_box()
+        if 'networks' in changed_kinds:
+            self.get_page('NetworkPage').refresh_combo_box()
+
+        self.after(500, self.refresh_changed_listings)
+
     def get_page(self, page_name: str) -> tk.Frame:
         """
         Get a page, permitting pages to interact between each other
@@ -135,6 +135,15 @@ class OrganizationPage(tk.Frame):
         self.combobox.current(0)
         self.combobox.pack()
 
+    def refresh_combo_box(self):
+        """
+        Updates the comboBox with the organizations listing refreshed in the background
+
+        :return:
+        """
+        if self.combobox is not None:
+            self.combobox['values'] = self.controller.automation.get_available_organizations_names_list()
+
     def validate_organization(self, organization_name):
         """
         Sets the working organization and then switch to the Network Page
@@ -200,6 +209,15 @@ class NetworkPage(tk.Frame):
         self.combobox.current(0)
         self.combobox.pack()
 
+    def refresh_combo_box(self):
+        """
+        Updates the comboBox with the networks listing refreshed in the background
+
+        :return:
+        """
+        if self.combobox is not None:
+            self.combobox['values'] = self.controller.automation.get_available_networks_names_list()
+
     def validate_network(self, network_name):
         """
         Sets the working network and then switch to the Template Page
@@ -324,8 +342,13 @@ class DnsPage(tk.Frame):
             # Displays Work in progress label
             self.label_work_in_progress.pack()
             # Starts the automation
-            self.controller.automation.update_network_static_devices_dns(dns_list=[dns_one_ip, dns_two_ip])
-            # Displays the done message
+            report = self.controller.automation.update_network_static_devices_dns(dns_list=[dns_one_ip, dns_two_ip])
+            # Prints the devices that couldn't be updated
+            for serial_number, error in report.errors.items():
+                print(f'Device {serial_number} was not updated: {error!r}')
+            # Displays the done message, with the number of updated and failed devices
+            self.label_done.config(text=f'Done ! Automation complete: {len(report.succeeded)} devices updated, '
+                                        f'{len(report.failed)} failed')
             self.label_done.pack()
 
         # If DNS 1 is invalid
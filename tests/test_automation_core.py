@@ -0,0 +1,360 @@
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import meraki
+import pytest
+import requests
+
+from automation import automation_core
+from automation.automation_core import AutomationCore
+from automation.bulk_client import BulkClient
+from automation.hedging import DeadlineExceeded, ReadPolicy
+
+
+def answer(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = 'reason'
+    response._content = json.dumps(body).encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+class DashboardServer:
+    """
+    Replaces the requests session of the meraki library with a small in-memory Dashboard, where one device can hang.
+    A network whose devices are None has a hanging devices listing.
+    """
+
+    def __init__(self, network_devices, slow_serial=None, organization_networks=None):
+        self.headers = {}
+        self.network_devices = network_devices
+        self.organization_networks = organization_networks or {}
+        self.slow_serial = slow_serial
+        self.updated = {}
+        self.listing_timeouts = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, json=None, **kwargs):
+        path = urllib.parse.urlparse(url).path.split('/')[3:]
+
+        # Organization networks listing
+        if path[0] == 'organizations':
+            return answer(200, [{'id': network_id, 'name': name}
+                                for network_id, name in self.organization_networks[path[1]]])
+
+        # Network devices listing
+        if path[0] == 'networks' and path[2:] == ['devices']:
+            if self.network_devices[path[1]] is None:
+                self.listing_timeouts.append(timeout)
+                time.sleep(timeout)
+                raise requests.exceptions.ReadTimeout()
+            return answer(200, [{'serial': serial, 'name': serial, 'networkId': path[1]}
+                                for serial in self.network_devices[path[1]]])
+
+        # Device management interface
+        serial = path[1]
+        if method == 'PUT':
+            with self._lock:
+                self.updated[serial] = json['wan1']
+            return answer(200, json)
+        if serial == self.slow_serial:
+            time.sleep(min(1, timeout))
+            if timeout < 1:
+                raise requests.exceptions.ReadTimeout()
+        return answer(200, {'wan1': {'usingStaticIp': serial != 'DHCP', 'staticDns': ['1.1.1.1', '1.0.0.1']}})
+
+
+def new_dashboard(http_session):
+    dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True)
+    dashboard._session._req_session = http_session
+    return dashboard
+
+
+def new_automation(dashboard):
+    automation = AutomationCore()
+    automation._dashboard = dashboard
+    automation._bulk_client = BulkClient(dashboard)
+    automation._network_id = 'N_1'
+    return automation
+
+
+def test_network_update_reports_each_device():
+    server = DashboardServer({'N_1': ['A', 'B', 'DHCP']})
+    report = new_automation(new_dashboard(server)).update_network_static_devices_dns(['9.9.9.9', '8.8.8.8'])
+
+    assert sorted(report.succeeded) == ['A', 'B']
+    assert report.failed == []
+    assert server.updated['A']['staticDns'] == ['9.9.9.9', '8.8.8.8']
+    assert 'DHCP' not in server.updated
+    assert report.concurrency >= 1
+
+
+def test_one_slow_device_does_not_stall_the_rollout():
+    server = DashboardServer({'N_1': ['A', 'SLOW', 'B', 'C', 'D']}, slow_serial='SLOW')
+    policy = ReadPolicy(deadline=0.3)
+
+    start = time.monotonic()
+    report = new_automation(new_dashboard(server)).update_network_static_devices_dns(['9.9.9.9', '8.8.8.8'],
+                                                                                     read_policy=policy)
+    policy.shutdown()
+
+    assert time.monotonic() - start < 1
+    assert sorted(server.updated) == ['A', 'B', 'C', 'D']
+    assert report.failed == ['SLOW']
+    assert isinstance(report.errors['SLOW'], DeadlineExceeded)
+
+
+def test_hanging_devices_listing_does_not_stall_the_rollout():
+    server = DashboardServer({'N_1': None})
+    policy = ReadPolicy(deadline=0.3)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        new_automation(new_dashboard(server)).update_network_static_devices_dns(['9.9.9.9', '8.8.8.8'],
+                                                                                read_policy=policy)
+    policy.shutdown()
+
+    assert time.monotonic() - start < 1
+    assert 0.2 < server.listing_timeouts[0] <= 0.3
+    assert server.updated == {}
+
+
+def test_get_network_devices_static_skips_unreadable_devices(capsys):
+    server = DashboardServer({'N_1': ['A', 'SLOW']}, slow_serial='SLOW')
+    automation = new_automation(new_dashboard(server))
+    policy = ReadPolicy(deadline=0.3)
+
+    assert automation.get_network_devices_static(read_policy=policy) == ['A']
+    policy.shutdown()
+    assert 'SLOW' in capsys.readouterr().out
+
+
+def test_policy_reads_pass_the_deadline_to_the_http_request():
+    class TimingOutSession:
+        headers = {}
+
+        def __init__(self):
+            self.timeouts = []
+
+        def request(self, method, url, **kwargs):
+            self.timeouts.append(kwargs['timeout'])
+            raise requests.exceptions.ReadTimeout()
+
+    dashboard = new_dashboard(TimingOutSession())
+    policy = ReadPolicy(deadline=0.5)
+
+    with pytest.raises(DeadlineExceeded):
+        new_automation(dashboard).check_device_static('Q2XX', read_policy=policy)
+    policy.shutdown()
+
+    # Sent once, with the deadline as timeout: the bulk run decides about retries
+    assert len(dashboard._session._req_session.timeouts) == 1
+    assert 0.4 < dashboard._session._req_session.timeouts[0] <= 0.5
+
+
+def test_api_key_check_keeps_the_library_retries(monkeypatch, tmp_path):
+    class FlakySession:
+        def __init__(self):
+            self.headers = {}
+            self.responses = [answer(503, {'errors': ['Unavailable']}), answer(200, [{'id': '1', 'name': 'Org'}])]
+
+        def request(self, method, url, **kwargs):
+            return self.responses.pop(0)
+
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(requests, 'session', FlakySession)
+
+    # The meraki library writes its log file in the working folder
+    monkeypatch.chdir(tmp_path)
+
+    assert AutomationCore().set_working_api_key('0' * 40, use_cache=False)
+
+
+class AnsweringSession:
+    """
+    Replaces the requests session of the meraki library, answering every request with the same status and body.
+    """
+
+    headers = {}
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+        self.urls = []
+
+    def request(self, method, url, **kwargs):
+        self.urls.append(url)
+        response = requests.Response()
+        response.status_code = self.status
+        response.reason = 'reason'
+        response._content = json.dumps(self.body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        return response
+
+
+def dashboard_answering(status, body):
+    dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True, maximum_retries=1)
+    dashboard._session._req_session = AnsweringSession(status, body)
+    return dashboard
+
+
+def test_serial_checks_ask_the_dashboard_for_the_single_device():
+    dashboard = dashboard_answering(200, {'serial': 'Q2XX', 'networkId': 'N_1'})
+    automation = new_automation(dashboard)
+    automation._org_id = 'O_1'
+
+    assert automation.check_organization_device_serial_number('Q2XX')
+    assert automation.check_network_device_serial_number('Q2XX')
+    assert not automation.check_network_device_serial_number('Q2XX', network_id='N_2')
+    assert dashboard._session._req_session.urls == [
+        'https://api.meraki.com/api/v1/organizations/O_1/inventoryDevices/Q2XX',
+        'https://api.meraki.com/api/v1/devices/Q2XX',
+        'https://api.meraki.com/api/v1/devices/Q2XX']
+
+
+def test_serial_checks_are_false_for_unknown_devices():
+    automation = new_automation(dashboard_answering(404, {'errors': ['Not found']}))
+    automation._org_id = 'O_1'
+
+    assert not automation.check_organization_device_serial_number('Q2XX')
+    assert not automation.check_network_device_serial_number('Q2XX')
+
+
+def test_serial_checks_raise_other_errors():
+    automation = new_automation(dashboard_answering(403, {'errors': ['Forbidden']}))
+
+    with pytest.raises(meraki.APIError):
+        automation.check_network_device_serial_number('Q2XX')
+
+
+class TopologyServer:
+    """
+    Replaces the requests session of the meraki library, serving the organizations and networks listings and counting
+    the requests of each listing.
+    """
+
+    def __init__(self):
+        self.headers = {}
+        self.networks = [{'id': 'N_1', 'name': 'Paris'}, {'id': 'N_2', 'name': 'Lyon'}]
+        self.counts = {}
+
+    def request(self, method, url, **kwargs):
+        path = urllib.parse.urlparse(url).path
+        self.counts[path] = self.counts.get(path, 0) + 1
+        if path == '/api/v1/organizations':
+            return answer(200, [{'id': 'O_1', 'name': 'Org'}])
+        return answer(200, self.networks)
+
+
+@pytest.fixture
+def topology_server(monkeypatch, tmp_path):
+    server = TopologyServer()
+    monkeypatch.setattr(requests, 'session', lambda: server)
+
+    # Keeps the cache and the meraki library log file in the test folder
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    return server
+
+
+def test_pages_flow_fetches_each_listing_once(topology_server):
+    automation = AutomationCore()
+
+    # Same calls as the interface pages, on a cold cache
+    assert automation.set_working_api_key('0' * 40)
+    assert automation.get_available_organizations_names_list() == ['Org']
+    automation.set_working_organization('Org')
+    assert automation.get_available_networks_names_list() == ['Paris', 'Lyon']
+    automation.set_working_network('Lyon')
+
+    assert automation._network_id == 'N_2'
+    assert topology_server.counts == {'/api/v1/organizations': 1, '/api/v1/organizations/O_1/networks': 1}
+
+
+def test_old_listings_are_revalidated_and_reported(topology_server, monkeypatch):
+    automation = AutomationCore()
+    assert automation.set_working_api_key('0' * 40)
+    automation.set_working_organization('Org')
+    assert automation.get_available_networks_names_list() == ['Paris', 'Lyon']
+
+    changed = threading.Event()
+    automation.set_listings_listener(lambda kind, scope: (kind, scope) == ('networks', 'O_1') and changed.set())
+    topology_server.networks = [{'id': 'N_1', 'name': 'Paris'}, {'id': 'N_2', 'name': 'Lyon 2'}]
+
+    # Once old enough, the cached listing is still returned right away, then refreshed in the background
+    monkeypatch.setattr(automation_core, 'LISTING_FRESHNESS', 0)
+    assert automation.get_available_networks_names_list() == ['Paris', 'Lyon']
+    assert changed.wait(1)
+    assert automation.get_available_networks_names_list() == ['Paris', 'Lyon 2']
+
+
+def test_new_api_key_closes_the_previous_cache(topology_server):
+    automation = AutomationCore()
+    assert automation.set_working_api_key('0' * 40)
+    previous_cache = automation._topology_cache
+
+    assert automation.set_working_api_key('1' * 40)
+
+    assert automation._topology_cache is not previous_cache
+    with pytest.raises(sqlite3.ProgrammingError):
+        previous_cache.get('organizations')
+
+
+def dns_of(serial_number):
+    return [f'10.0.0.{int(serial_number[-2:])}', f'10.0.1.{int(serial_number[-2:])}']
+
+
+def test_update_devices_dns_updates_the_given_devices():
+    server = DashboardServer({})
+    report = new_automation(new_dashboard(server)).update_devices_dns(['A', 'DHCP'], ['9.9.9.9', '8.8.8.8'])
+
+    # Devices given explicitly are updated, static IP or not
+    assert report.succeeded == ['A', 'DHCP']
+    assert server.updated == {'A': {'usingStaticIp': True, 'staticDns': ['9.9.9.9', '8.8.8.8']},
+                              'DHCP': {'usingStaticIp': False, 'staticDns': ['9.9.9.9', '8.8.8.8']}}
+
+
+def test_explicit_organization_and_network_ids_are_used():
+    server = DashboardServer({'N_1': ['A'], 'N_2': ['B', 'C']},
+                             organization_networks={'O_1': [('N_1', 'Paris')], 'O_2': [('N_2', 'Lyon')]})
+    automation = new_automation(new_dashboard(server))
+    automation._org_id = 'O_1'
+
+    assert automation.get_available_networks_names_list(organization_id='O_2') == ['Lyon']
+    assert automation.get_network_devices_static(network_id='N_2') == ['B', 'C']
+    report = automation.update_network_static_devices_dns(['9.9.9.9', '8.8.8.8'], network_id='N_2')
+
+    assert sorted(report.succeeded) == ['B', 'C']
+    assert sorted(server.updated) == ['B', 'C']
+
+
+def test_shared_instance_can_be_used_from_several_threads():
+    serial_numbers = [f'Q2XX-{i:02d}' for i in range(40)]
+    server = DashboardServer({'N_1': [], 'N_2': serial_numbers},
+                             organization_networks={'O_1': [('N_1', 'Paris'), ('N_2', 'Lyon')]})
+    automation = new_automation(new_dashboard(server))
+    automation._org_id = 'O_1'
+
+    def switch_working_network():
+        for network_name in ['Paris', 'Lyon'] * 20:
+            automation.set_working_network(network_name)
+
+    # Single device updates and a bulk run on an explicit network, while the working network keeps changing
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        switches = [executor.submit(switch_working_network) for _ in range(2)]
+        updates = [executor.submit(automation.update_device_dns, serial_number, dns_of(serial_number))
+                   for serial_number in serial_numbers]
+        bulk = executor.submit(automation.update_network_static_devices_dns, ['9.9.9.9', '8.8.8.8'], network_id='N_1')
+        for future in switches + updates:
+            future.result()
+
+    # Each device got its own DNS, the bulk run stayed on its empty network
+    assert server.updated == {serial_number: {'usingStaticIp': True, 'staticDns': dns_of(serial_number)}
+                              for serial_number in serial_numbers}
+    assert bulk.result().succeeded == []
+    assert automation._network_id == 'N_2'
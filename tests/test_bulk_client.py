@@ -0,0 +1,115 @@
+import json
+import time
+
+import meraki
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from automation.automation_core import AutomationCore
+from automation.bulk_client import BulkClient
+from automation.concurrency import AdaptiveConcurrencyController
+from automation.hedging import DeadlineExceeded, ReadPolicy
+
+WAN1 = {'usingStaticIp': True, 'staticDns': ['1.1.1.1', '1.0.0.1']}
+
+
+def answer(status, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = 'reason'
+    response._content = json.dumps(body).encode('utf-8') if body is not None else b''
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json', **(headers or {})})
+    return response
+
+
+class StubHttpSession:
+    """
+    Replaces the requests session of the meraki library, answering with the queued responses or raising the queued
+    exceptions.
+    """
+
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def dashboard_with(responses):
+    dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True)
+    dashboard._session._req_session = StubHttpSession(responses)
+    return dashboard
+
+
+def test_rate_limiting_is_waited_once_outside_the_slot(monkeypatch):
+    dashboard = dashboard_with([answer(200, {'wan1': dict(WAN1)}), answer(429, {'errors': []}, {'Retry-After': '2'}),
+                                answer(200, {'wan1': dict(WAN1)}), answer(200, {'wan1': WAN1})])
+    automation = AutomationCore()
+    automation._dashboard = dashboard
+    automation._bulk_client = BulkClient(dashboard)
+    controller = AdaptiveConcurrencyController(initial=4, minimum=1, maximum=8)
+    policy = ReadPolicy()
+
+    # Records each wait, with the number of slots taken meanwhile
+    sleeps = []
+    monkeypatch.setattr(time, 'sleep', lambda seconds: sleeps.append((seconds, controller.in_flight)))
+
+    report = automation._run_bulk(controller, ['Q2XX'],
+                                  lambda serial_number: automation.update_device_dns(
+                                      serial_number, ['9.9.9.9', '8.8.8.8'], read_policy=policy))
+
+    assert report.succeeded == ['Q2XX']
+    assert sleeps == [(2.0, 0)]
+    assert [method for method, url, kwargs in dashboard._session._req_session.requests] == ['GET', 'PUT', 'GET', 'PUT']
+    assert dashboard._session._req_session.requests[-1][2]['json'] == {'wan1': {'usingStaticIp': True,
+                                                                                'staticDns': ['9.9.9.9', '8.8.8.8']}}
+    assert controller.limit == 2
+
+
+@pytest.mark.parametrize('status', [429, 500, 503, 404])
+def test_errors_are_raised_without_retry(monkeypatch, status):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: pytest.fail('The bulk client must not wait'))
+    dashboard = dashboard_with([answer(status, {'errors': ['error']})])
+
+    with pytest.raises(meraki.APIError) as error:
+        BulkClient(dashboard).get_management_interface('Q2XX')
+
+    assert error.value.status == status
+    assert len(dashboard._session._req_session.requests) == 1
+
+
+def test_connection_errors_have_no_status():
+    dashboard = dashboard_with([requests.exceptions.ConnectionError(), requests.exceptions.ReadTimeout()])
+
+    with pytest.raises(meraki.APIError) as error:
+        BulkClient(dashboard).get_management_interface('Q2XX')
+    assert error.value.status is None
+
+    # Without deadline, a timeout is a connection error like the others
+    with pytest.raises(meraki.APIError) as error:
+        BulkClient(dashboard).get_management_interface('Q2XX')
+    assert error.value.status is None
+
+
+def test_timeout_is_a_deadline():
+    dashboard = dashboard_with([requests.exceptions.ReadTimeout()])
+
+    with pytest.raises(DeadlineExceeded):
+        BulkClient(dashboard).get_management_interface('Q2XX', timeout=0.5)
+    assert dashboard._session._req_session.requests[0][2]['timeout'] == 0.5
+
+
+def test_redirects_move_the_session_to_the_shard():
+    shard_url = 'https://n123.meraki.com/api/v1/devices/Q2XX/managementInterface'
+    dashboard = dashboard_with([answer(308, headers={'Location': shard_url}), answer(200, {'wan1': WAN1})])
+
+    assert BulkClient(dashboard).get_management_interface('Q2XX') == {'wan1': WAN1}
+    assert dashboard._session._req_session.requests[1][1] == shard_url
+    assert dashboard._session._base_url == 'https://n123.meraki.com/api/v1'
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import meraki
+import pytest
+
+from automation import automation_core
+from automation.concurrency import AdaptiveConcurrencyController, percentile
+
+
+class FakeResponse:
+    """
+    Minimal requests response, enough to build a meraki.APIError.
+    """
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.reason = 'reason'
+        self.headers = headers or {}
+        self.content = b'{}'
+
+    def json(self):
+        return {}
+
+
+def api_error(status, headers=None):
+    return meraki.APIError({'tags': ['devices'], 'operation': 'test'}, FakeResponse(status, headers))
+
+
+def run_window(controller, latency, failed=False):
+    """
+    Completes a full window of requests with the given latency.
+    """
+    for _ in range(controller.limit):
+        generation = controller.acquire()
+        controller.release(generation, latency, failed=failed)
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 0.95) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
+
+
+def test_invalid_bounds_are_refused():
+    with pytest.raises(ValueError):
+        AdaptiveConcurrencyController(initial=20, minimum=1, maximum=16)
+
+
+def test_healthy_windows_grow_the_limit_up_to_the_maximum():
+    controller = AdaptiveConcurrencyController(initial=2, minimum=1, maximum=5)
+    for expected in (3, 4, 5, 5):
+        run_window(controller, 0.1)
+        assert controller.limit == expected
+
+
+def test_throttling_halves_the_limit_once_per_generation():
+    controller = AdaptiveConcurrencyController(initial=8, minimum=1, maximum=16)
+    generations = [controller.acquire() for _ in range(3)]
+
+    controller.release(generations[0], 0.1, throttled=True)
+    assert controller.limit == 4
+
+    # Requests started under the former limit don't make it back off again
+    controller.release(generations[1], 0.1, throttled=True)
+    controller.release(generations[2], 0.1, throttled=True)
+    assert controller.limit == 4
+
+
+def test_rising_p95_backs_off():
+    controller = AdaptiveConcurrencyController(initial=4, minimum=1, maximum=16)
+    run_window(controller, 0.1)
+    assert controller.limit == 5
+    run_window(controller, 1.0)
+    assert controller.limit == 2
+
+
+def test_errors_back_off():
+    controller = AdaptiveConcurrencyController(initial=4, minimum=1, maximum=16)
+    run_window(controller, 0.1, failed=True)
+    assert controller.limit == 2
+
+
+def test_baseline_decays_after_a_lucky_window():
+    controller = AdaptiveConcurrencyController(initial=4, minimum=1, maximum=64)
+    run_window(controller, 0.01)
+
+    # The Dashboard is steadily slower than that lucky window: backs off first, then grows again
+    limits = []
+    for _ in range(30):
+        run_window(controller, 0.1)
+        limits.append(controller.limit)
+    assert limits[0] < 5
+    assert limits[-1] > limits[0] + 5
+
+
+def test_acquire_waits_for_a_free_slot():
+    controller = AdaptiveConcurrencyController(initial=1, minimum=1, maximum=1)
+    generation = controller.acquire()
+    acquired = threading.Event()
+
+    def second_request():
+        controller.release(controller.acquire(), 0.1)
+        acquired.set()
+
+    threading.Thread(target=second_request).start()
+    assert not acquired.wait(0.05)
+    controller.release(generation, 0.1)
+    assert acquired.wait(1)
+
+
+def test_slot_reports_429_as_throttling():
+    controller = AdaptiveConcurrencyController(initial=8, minimum=1, maximum=16)
+    with pytest.raises(meraki.APIError):
+        with controller.slot():
+            raise api_error(429)
+    assert controller.limit == 4
+    assert controller.in_flight == 0
+
+
+def test_run_bulk_reports_each_device_and_retries_throttling(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    controller = AdaptiveConcurrencyController(initial=4, minimum=1, maximum=8)
+    attempts = {}
+
+    def operation(serial_number):
+        attempts[serial_number] = attempts.get(serial_number, 0) + 1
+        if serial_number == 'THROTTLED' and attempts[serial_number] == 1:
+            raise api_error(429, {'Retry-After': '2'})
+        if serial_number == 'MISSING':
+            raise api_error(404)
+        return serial_number.lower()
+
+    report = automation_core.AutomationCore._run_bulk(controller, ['A', 'THROTTLED', 'MISSING', 'B'], operation)
+
+    assert report.results == {'A': 'a', 'THROTTLED': 'throttled', 'B': 'b'}
+    assert list(report.errors) == ['MISSING']
+    assert report.errors['MISSING'].status == 404
+    assert attempts == {'A': 1, 'THROTTLED': 2, 'MISSING': 1, 'B': 1}
+    assert report.concurrency == controller.limit
+
+
+def test_retry_delay_follows_retry_after():
+    assert automation_core.retry_delay(api_error(429, {'Retry-After': '3'})) == 3.0
+    assert automation_core.retry_delay(api_error(503)) == 1.0
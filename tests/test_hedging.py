@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from automation.hedging import DeadlineExceeded, ReadPolicy
+
+
+def honest_read(delay, result='ok'):
+    """
+    Read sleeping for the given delay, but never longer than the timeout it is given, like an HTTP request.
+    """
+    def read(timeout=None):
+        if timeout is not None and timeout < delay:
+            time.sleep(timeout)
+            raise DeadlineExceeded('request timed out')
+        time.sleep(delay)
+        return result
+    return read
+
+
+@pytest.fixture
+def policies():
+    created = []
+
+    def new_policy(**kwargs):
+        created.append(ReadPolicy(**kwargs))
+        return created[-1]
+
+    yield new_policy
+    for policy in created:
+        policy.shutdown()
+
+
+def test_invalid_settings_are_refused():
+    with pytest.raises(ValueError):
+        ReadPolicy(deadline=0)
+    with pytest.raises(ValueError):
+        ReadPolicy(hedge_percentile=1.5)
+    with pytest.raises(ValueError):
+        ReadPolicy(hedge_percentile=0.9, hedge_budget=-0.1)
+    with pytest.raises(ValueError):
+        ReadPolicy(hedge_percentile=0.9, hedge_budget=1.5)
+
+
+def test_without_deadline_nor_hedging_the_read_is_direct(policies):
+    policy = policies()
+    assert policy.call(lambda value: (value, threading.current_thread()), 'x') == ('x', threading.current_thread())
+
+
+def test_deadline_gives_the_read_its_timeout(policies):
+    policy = policies(deadline=0.5)
+    timeouts = []
+
+    def read(timeout=None):
+        timeouts.append(timeout)
+        return 'ok'
+
+    assert policy.call(read) == 'ok'
+    assert 0.4 < timeouts[0] <= 0.5
+
+
+def test_deadline_is_raised_on_slow_reads(policies):
+    policy = policies(deadline=0.1)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda timeout=None: time.sleep(1))
+    assert time.monotonic() - start < 0.5
+
+
+def test_abandoned_reads_do_not_starve_the_next_ones(policies):
+    policy = policies(deadline=0.2, max_workers=2)
+
+    # Two hanging reads use every thread of the pool
+    hung = [threading.Thread(target=lambda: pytest.raises(DeadlineExceeded, policy.call, honest_read(60)))
+            for _ in range(2)]
+    for thread in hung:
+        thread.start()
+    time.sleep(0.05)
+
+    # The next read waits for a free thread, then gets its whole deadline
+    assert policy.call(honest_read(0.01)) == 'ok'
+    for thread in hung:
+        thread.join()
+
+
+def test_slow_read_is_hedged_and_the_fast_duplicate_wins(policies):
+    policy = policies(hedge_percentile=0.9, hedge_budget=0.5, min_samples=5)
+    for _ in range(5):
+        policy.call(honest_read(0.01))
+
+    calls = []
+
+    def read():
+        calls.append(1)
+        return honest_read(1 if len(calls) == 1 else 0.01, result=len(calls))()
+
+    start = time.monotonic()
+    assert policy.call(read) == 2
+    assert time.monotonic() - start < 0.5
+    assert policy.hedges == 1
+
+
+def test_hedges_are_capped_by_the_budget(policies):
+    policy = policies(hedge_percentile=0.5, hedge_budget=0.1, min_samples=5)
+    for _ in range(5):
+        policy.call(honest_read(0.01))
+
+    # Every read is slower than the percentile, but only one read out of ten may be duplicated
+    for _ in range(10):
+        policy.call(honest_read(0.05))
+    assert policy.hedges == 1
+
+
+def test_failed_primary_falls_back_on_the_duplicate(policies):
+    policy = policies(hedge_percentile=0.5, hedge_budget=1, min_samples=3)
+    for _ in range(3):
+        policy.call(honest_read(0.01))
+
+    calls = []
+
+    def read():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise RuntimeError('primary failed')
+        time.sleep(0.2)
+        return 'duplicate'
+
+    assert policy.call(read) == 'duplicate'
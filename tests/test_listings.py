@@ -0,0 +1,130 @@
+import json
+import time
+
+import meraki
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from automation import listings
+from automation import models
+
+NETWORKS_METADATA = {'tags': ['organizations', 'configure', 'networks'], 'operation': 'getOrganizationNetworks'}
+
+
+class StubResponse(requests.Response):
+    """
+    Response built from a status, a body and headers.
+    """
+
+    def __init__(self, status_code, body=b'', headers=None):
+        super().__init__()
+        self.status_code = status_code
+        self.reason = 'reason'
+        self._content = body
+        self._content_consumed = True
+        self.headers = CaseInsensitiveDict(headers or {})
+
+
+class StubHttpSession:
+    """
+    Replaces the requests session of the meraki library, answering with the queued responses.
+    """
+
+    def __init__(self, responses):
+        self.headers = {}
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+
+def page(rows, next_url=None):
+    headers = {'Content-Type': 'application/json'}
+    if next_url:
+        headers['Link'] = f'<{next_url}>; rel=next'
+    return StubResponse(200, json.dumps(rows).encode('utf-8'), headers)
+
+
+def dashboard_with(responses, **kwargs):
+    dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True, **kwargs)
+    dashboard._session._req_session = StubHttpSession(responses)
+    return dashboard
+
+
+def test_fetch_records_follows_pages_through_a_real_dashboard():
+    next_url = 'https://api.meraki.com/api/v1/organizations/1/networks?startingAfter=N_2'
+    dashboard = dashboard_with([
+        page([{'id': 'N_1', 'name': 'Paris', 'productTypes': ['appliance']}, {'id': 'N_2', 'name': 'Lyon'}],
+             next_url),
+        page([{'id': 'N_3', 'name': 'Nice', 'timeZone': 'Europe/Paris'}]),
+    ])
+
+    networks = listings.fetch_records(dashboard, NETWORKS_METADATA, '/organizations/1/networks',
+                                      models.Network.from_json, params={'perPage': 2})
+
+    assert [(network.id, network.name) for network in networks] == [('N_1', 'Paris'), ('N_2', 'Lyon'),
+                                                                      ('N_3', 'Nice')]
+    sent = dashboard._session._req_session.requests
+    assert sent[0][1] == 'https://api.meraki.com/api/v1/organizations/1/networks'
+    assert sent[0][2]['params'] == {'perPage': 2}
+    assert sent[1][1] == next_url
+
+
+def test_client_errors_raise_meraki_errors_with_the_method_metadata():
+    dashboard = dashboard_with([StubResponse(404, b'{"errors": ["Not found"]}')])
+
+    with pytest.raises(meraki.APIError) as error:
+        listings.fetch_records(dashboard, NETWORKS_METADATA, '/organizations/1/networks',
+                               models.Network.from_json)
+
+    assert error.value.status == 404
+    assert error.value.tag == 'organizations'
+    assert error.value.operation == 'getOrganizationNetworks'
+
+
+def test_rate_limiting_waits_and_retries(monkeypatch):
+    waits = []
+    monkeypatch.setattr(time, 'sleep', waits.append)
+    dashboard = dashboard_with([StubResponse(429, headers={'Retry-After': '2'}), page([{'id': 'N_1', 'name': 'A'}])])
+
+    networks = listings.fetch_records(dashboard, NETWORKS_METADATA, '/organizations/1/networks',
+                                      models.Network.from_json)
+
+    assert [network.id for network in networks] == ['N_1']
+    assert waits == [2]
+
+
+def test_shard_redirects_move_the_library_session():
+    shard_url = 'https://n123.meraki.com/api/v1/organizations/1/networks'
+    dashboard = dashboard_with([StubResponse(308, headers={'Location': shard_url}),
+                                page([{'id': 'N_1', 'name': 'A'}])])
+
+    networks = listings.fetch_records(dashboard, NETWORKS_METADATA, '/organizations/1/networks',
+                                      models.Network.from_json)
+
+    assert [network.id for network in networks] == ['N_1']
+    assert dashboard._session._req_session.requests[1][1] == shard_url
+    assert dashboard._session._base_url == 'https://n123.meraki.com/api/v1'
+
+
+def test_library_settings_are_followed(monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    dashboard = dashboard_with([StubResponse(404, b'{"errors": ["Not found"]}'), page([{'id': 'N_1', 'name': 'A'}])],
+                               retry_4xx_error=True)
+
+    networks = listings.fetch_records(dashboard, NETWORKS_METADATA, '/organizations/1/networks',
+                                      models.Network.from_json)
+
+    assert [network.id for network in networks] == ['N_1']
+
+
+def test_enable_compression_sets_accept_encoding():
+    dashboard = meraki.DashboardAPI(api_key='0' * 40, suppress_logging=True)
+    assert 'Accept-Encoding' not in dashboard._session._req_session.headers
+
+    listings.enable_compression(dashboard)
+
+    assert 'gzip' in dashboard._session._req_session.headers['Accept-Encoding']
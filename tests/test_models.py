@@ -0,0 +1,49 @@
+import pytest
+
+from automation import models
+
+
+def test_records_keep_only_the_needed_fields():
+    organization = models.Organization.from_json({'id': 'O_1', 'name': 'Org', 'url': 'https://n1.meraki.com/o/1',
+                                                  'api': {'enabled': True}})
+    network = models.Network.from_json({'id': 'N_1', 'organizationId': 'O_1', 'name': 'Paris',
+                                        'productTypes': ['appliance'], 'timeZone': 'Europe/Paris'})
+    device = models.Device.from_json({'serial': 'Q2XX-AAAA-AAAA', 'name': 'mx', 'model': 'MX68', 'networkId': 'N_1',
+                                      'lanIp': '10.0.0.1'})
+
+    assert (organization.id, organization.name) == ('O_1', 'Org')
+    assert (network.id, network.name) == ('N_1', 'Paris')
+    assert device.serial == 'Q2XX-AAAA-AAAA'
+    assert repr(device) == "Device(serial='Q2XX-AAAA-AAAA')"
+
+    # Slotted records have no per-instance dict to hold extra fields
+    for record in (organization, network, device):
+        assert not hasattr(record, '__dict__')
+        with pytest.raises(AttributeError):
+            record.model = 'MX68'
+
+
+def test_missing_needed_field_is_an_error():
+    with pytest.raises(KeyError):
+        models.Device.from_json({'name': 'mx'})
+
+
+def test_device_listing_keeps_the_listing_order():
+    rows = [{'serial': 'Q2XX-BBBB-BBBB', 'name': 'b'}, {'serial': 'Q2XX-AAAA-AAAA', 'name': 'a'},
+            {'serial': 'Q2XX-CCCC-CCCC'}]
+
+    listing = models.DeviceListing.from_json(iter(rows))
+
+    assert listing.serials() == ['Q2XX-BBBB-BBBB', 'Q2XX-AAAA-AAAA', 'Q2XX-CCCC-CCCC']
+    assert [device.serial for device in listing] == listing.serials()
+    assert len(listing) == 3
+
+    # The rows iterator is consumed once, the listing can still be read again
+    assert len(list(listing)) == 3
+
+
+def test_empty_device_listing():
+    listing = models.DeviceListing([])
+
+    assert listing.serials() == []
+    assert len(listing) == 0
@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import pytest
+
+from automation import models
+from automation.topology_cache import TopologyCache
+
+
+def networks(*names):
+    return [models.Network(f'N_{name}', name) for name in names]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TopologyCache('0123456789abcdef', directory=str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def test_unknown_listing_is_none(cache):
+    assert cache.get('networks', 'O_1') is None
+
+
+def test_round_trip_keeps_records_and_order(cache):
+    cache.update('networks', 'O_1', networks('Paris', 'Lyon', 'Nice'))
+
+    saved = cache.get('networks', 'O_1')
+
+    assert [(network.id, network.name) for network in saved] == [('N_Paris', 'Paris'), ('N_Lyon', 'Lyon'),
+                                                                 ('N_Nice', 'Nice')]
+    assert isinstance(saved[0], models.Network)
+    assert cache.get('networks', 'O_2') is None
+
+
+def test_empty_listing_is_known(cache):
+    cache.update('organizations', '', [])
+    assert cache.get('organizations', '') == []
+
+
+def test_inserting_at_the_front_writes_a_single_record(cache):
+    names = [f'site-{i}' for i in range(1000)]
+    assert cache.update('networks', 'O_1', networks(*names)) == 1000
+
+    assert cache.update('networks', 'O_1', networks('new', *names)) == 1
+    assert [network.name for network in cache.get('networks', 'O_1')][:2] == ['new', 'site-0']
+
+
+def test_renames_and_removals_are_the_only_writes(cache):
+    cache.update('networks', 'O_1', networks('Paris', 'Lyon', 'Nice'))
+
+    renamed = networks('Paris', 'Nice')
+    renamed[0].name = 'Paris 15'
+
+    assert cache.update('networks', 'O_1', renamed) == 2
+    assert [(network.id, network.name) for network in cache.get('networks', 'O_1')] == [('N_Paris', 'Paris 15'),
+                                                                                        ('N_Nice', 'Nice')]
+    assert cache.update('networks', 'O_1', renamed) == 0
+
+
+def test_cache_survives_a_new_launch(tmp_path):
+    TopologyCache('key', directory=str(tmp_path)).update('organizations', '', [models.Organization('1', 'Org')])
+
+    reopened = TopologyCache('key', directory=str(tmp_path))
+    assert [(organization.id, organization.name) for organization in reopened.get('organizations', '')] == [
+        ('1', 'Org')]
+    assert TopologyCache('other key', directory=str(tmp_path)).get('organizations', '') is None
+
+
+def test_file_name_does_not_contain_the_api_key(cache):
+    assert '0123456789abcdef' not in cache.path
+
+
+def test_older_layout_is_dropped(tmp_path):
+    path = TopologyCache('key', directory=str(tmp_path)).path
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute('PRAGMA user_version = 1')
+    connection.close()
+
+    reopened = TopologyCache('key', directory=str(tmp_path))
+    assert reopened.get('organizations', '') is None
+    reopened.update('organizations', '', [models.Organization('1', 'Org')])
+    assert len(reopened.get('organizations', '')) == 1
+
+
+def test_updated_at_tells_when_a_listing_was_saved(cache):
+    assert cache.updated_at('networks', 'O_1') is None
+
+    before = time.time()
+    cache.update('networks', 'O_1', networks('Paris'))
+
+    assert before <= cache.updated_at('networks', 'O_1') <= time.time()